@@ -9,6 +9,8 @@ from app.settings import settings
 # from data.cache.redis_cache import RedisCache
 # from data.events.broker.rabbitmq.rabbitmq_impl import RabbitMQEventBroker
 from data.hello.datasources.mock_db_hello import MockHelloDatasource
+from data.network.http_client import HttpClient
+from data.network.http_client_impl import HttpClientImpl
 
 # from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase
 # from data.storage.postgresql_database import PostgresDatabase
@@ -38,20 +40,27 @@ async def lifespan(app: FastAPI | None = None):
     logger_adapter = ConsoleLoggerAdapter(settings)
     container.register(LoggerAdapter, instance=logger_adapter)
 
+    http_client = HttpClientImpl(settings)
+    container.register(HttpClient, instance=http_client)
+
     # pg = AsyncpgPostgresDatabase()
     # await pg.init(settings.postgres)
     # container.register(PostgresDatabase, instance=pg)
 
-    # container.register(EventBroker, instance=RabbitMQEventBroker(settings))
+    # broker = RabbitMQEventBroker(settings)
+    # container.register(EventBroker, instance=broker)
 
     # redis_cache = RedisCache()
+    # await redis_cache.init()
     # container.register(Cache, instance=redis_cache)
 
     with logger_adapter.setup():
         container.register(logging.Logger, instance=logging.getLogger("app"))
         yield
 
+    await http_client.close()
     # await pg.close()
+    # await broker.close()
     # await redis_cache.close()
 
 
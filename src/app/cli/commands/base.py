@@ -1,10 +1,15 @@
+from typing import Awaitable, Callable
+
 import di
 import typer
 from app.cli.commands.example import example
-from app.cli.decorators.async_run import async_run
+from app.cli.concurrent_processor import ConcurrentProcessor
+from app.cli.decorators.async_run import async_run, shutdown_requested
 from app.settings import settings
 from domain.events.broker import EventBroker
+from domain.events.controllable_event import ControllableEvent
 from domain.events.parser import EventParser
+from domain.events.processable_event import ProcessableEvent
 from domain.events.registry import EventHandlerRegistry
 
 cli = typer.Typer()
@@ -14,17 +19,16 @@ cli = typer.Typer()
 @async_run
 async def listen_queue(
     queue: str = "etl",
+    concurrency: int = 1,
+    prefetch_count: int | None = None,
+    batch_routing: bool = False,
 ) -> None:
     typer.echo(f"Started listen queue {queue}")
 
     handler_registry = EventHandlerRegistry([])
-    broker = di.resolve(EventBroker)()
-    event_parser = EventParser(handler_registry)
-
-    async for broker_event in broker.listen(queue):
-        async with broker_event.process() as message:
-            event = event_parser.parse(message)
-            await handler_registry.route(event)
+    # Batched routing groups events handled concurrently, so it makes sense with concurrency > 1
+    route = handler_registry.route_batched if batch_routing else handler_registry.route
+    await consume(queue, handler_registry, route, concurrency, prefetch_count)
 
     typer.echo(f"Finished listen queue {queue}")
 
@@ -33,17 +37,13 @@ async def listen_queue(
 @async_run
 async def task_worker(
     queue: str = settings.task_queue_name,
+    concurrency: int = 1,
+    prefetch_count: int | None = None,
 ) -> None:
     typer.echo(f"Started listen task queue {queue}")
 
     handler_registry = EventHandlerRegistry([])
-    broker = di.resolve(EventBroker)()
-    event_parser = EventParser(handler_registry)
-
-    async for broker_event in broker.listen(queue):
-        async with broker_event.process() as message:
-            event = event_parser.parse(message)
-            await handler_registry.route_task(event)
+    await consume(queue, handler_registry, handler_registry.route_task, concurrency, prefetch_count)
 
     typer.echo(f"Finished listen task queue {queue}")
 
@@ -52,3 +52,27 @@ async def task_worker(
 @async_run
 async def example_task() -> None:
     await example()
+
+
+async def consume(
+    queue: str,
+    handler_registry: EventHandlerRegistry,
+    route: Callable[[ControllableEvent], Awaitable[None]],
+    concurrency: int,
+    prefetch_count: int | None,
+) -> None:
+    broker = di.resolve(EventBroker)()
+    event_parser = EventParser(handler_registry)
+
+    async def process(broker_event: ProcessableEvent) -> None:
+        async with broker_event.process() as message:
+            event = event_parser.parse(message)
+            await route(event)
+
+    await ConcurrentProcessor.run(
+        broker.listen(queue, prefetch_count),
+        process,
+        max_queue_size=concurrency,
+        max_concurrency=concurrency,
+        stop=shutdown_requested(),
+    )
@@ -13,6 +13,7 @@ class ConcurrentProcessor(Generic[TValue]):
         *,
         max_queue_size: int = 10000,
         max_concurrency: int = 10,
+        stop: asyncio.Event | None = None,
     ):
         queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
 
@@ -29,13 +30,36 @@ class ConcurrentProcessor(Generic[TValue]):
                 queue.task_done()
 
         workers = [asyncio.create_task(queue_worker(f"worker-{i}", queue)) for i in range(max_concurrency)]
+        stopped = asyncio.create_task(stop.wait()) if stop else None
+        next_item: asyncio.Future | None = None
 
-        async for item in source:
-            await queue.put(item)
+        try:
+            while True:
+                next_item = asyncio.ensure_future(anext(source))
+                await asyncio.wait([next_item, stopped] if stopped else [next_item], return_when=asyncio.FIRST_COMPLETED)
+
+                if not next_item.done():
+                    break
+
+                received, next_item = next_item, None
+                try:
+                    item = received.result()
+                except StopAsyncIteration:
+                    break
+
+                await queue.put(item)
+
+            # Drain in-flight items before the source is closed: e.g. a broker channel has to stay
+            # open until every consumed message is acked
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
 
-        await queue.join()
+            if next_item is not None:
+                next_item.cancel()
 
-        for worker in workers:
-            worker.cancel()
+            if stopped is not None:
+                stopped.cancel()
 
-        await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*workers, *filter(None, [next_item, stopped]), return_exceptions=True)
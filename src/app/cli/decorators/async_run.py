@@ -1,16 +1,48 @@
 import asyncio
 import functools
 import signal
+from contextvars import ContextVar
 from typing import Awaitable, Callable
 
 from app.bootstrap import lifespan
 
 
+class Shutdown:
+    def __init__(self, task: asyncio.Task):
+        self._task = task
+        self._event = asyncio.Event()
+        self._watched = False
+
+    def requested(self) -> asyncio.Event:
+        """Returns event which is set on SIGINT/SIGTERM; the command is expected to finish on its own after that"""
+        self._watched = True
+        return self._event
+
+    def signal(self) -> None:
+        # Commands which don't watch for shutdown (or ignore a repeated signal) are cancelled
+        if self._watched and not self._event.is_set():
+            self._event.set()
+        else:
+            self._task.cancel()
+
+
+current_shutdown: ContextVar[Shutdown | None] = ContextVar("current_shutdown", default=None)
+
+
+def shutdown_requested() -> asyncio.Event:
+    shutdown = current_shutdown.get()
+    assert shutdown, "Command is not running with @async_run"
+    return shutdown.requested()
+
+
 def async_run(func: Callable[..., Awaitable[None]]):
     async def routine(*args, **kwargs):
         loop = asyncio.get_running_loop()
+        shutdown = Shutdown(asyncio.current_task())
+        current_shutdown.set(shutdown)
+
         for signal_name in {signal.SIGINT, signal.SIGTERM}:
-            loop.add_signal_handler(signal_name, lambda signum, frame: loop.stop())
+            loop.add_signal_handler(signal_name, shutdown.signal)
 
         async with lifespan():
             return await func(*args, **kwargs)
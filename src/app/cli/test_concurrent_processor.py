@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from app.cli.concurrent_processor import ConcurrentProcessor
+
+
+@pytest.mark.unit
+async def test_process_all_items_concurrently():
+    processed: list[int] = []
+    in_flight = 0
+    max_in_flight = 0
+
+    async def source():
+        for item in range(10):
+            yield item
+
+    async def process(item: int) -> None:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        processed.append(item)
+        in_flight -= 1
+
+    await ConcurrentProcessor.run(source(), process, max_queue_size=3, max_concurrency=3)
+
+    assert sorted(processed) == list(range(10))
+    assert max_in_flight == 3
+
+
+@pytest.mark.unit
+async def test_stop_drains_in_flight_items():
+    stop = asyncio.Event()
+    processed: list[int] = []
+    source_closed = False
+
+    async def source():
+        nonlocal source_closed
+        try:
+            yield 1
+            yield 2
+            await asyncio.Event().wait()
+        finally:
+            source_closed = True
+
+    async def process(item: int) -> None:
+        stop.set()
+        await asyncio.sleep(0.01)
+        assert not source_closed
+        processed.append(item)
+
+    await asyncio.wait_for(ConcurrentProcessor.run(source(), process, max_concurrency=2, stop=stop), 1)
+
+    assert sorted(processed) == [1, 2]
+    assert source_closed
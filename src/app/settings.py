@@ -2,6 +2,7 @@ import os
 
 from data.cache.config import RedisConfig
 from data.events.broker.rabbitmq.config import EventBrokerConfig
+from data.network.config import HttpClientConfig
 from data.storage.postgres.config import PostgresConfig
 from domain.environment.env import Env
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -17,6 +18,9 @@ class Settings(BaseSettings):
     postgres: PostgresConfig | None = None
     broker: EventBrokerConfig | None = None
     redis: RedisConfig | None = None
+    http_client: HttpClientConfig = HttpClientConfig()
+
+    task_queue_name: str = "tasks"
 
     model_config = SettingsConfigDict(
         env_file=(PROJECT_DIRECTORY / ".env", PROJECT_DIRECTORY / ".env.local"),
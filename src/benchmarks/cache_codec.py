@@ -0,0 +1,90 @@
+"""
+Compares the previous TypedCache serialization (model_dump + orjson, orjson + model(**data))
+with cache codecs on a large model: encode and decode time and the size of the stored value.
+
+Needs no services, msgpack, zstandard and lz4 must be installed:
+    PYTHONPATH=src python -m benchmarks.cache_codec
+"""
+
+import time
+from datetime import datetime, timezone
+
+import orjson
+from data.cache.codec import CacheCodec, CompressedCodec, Compression, JsonCodec, MsgpackCodec
+from domain.cache.models.cache_model import CacheModel
+from pydantic import BaseModel
+
+ROUNDS = 2_000
+
+
+class Line(BaseModel):
+    sku: str
+    quantity: int
+    price: float
+    created_at: datetime
+
+
+class Order(CacheModel):
+    id: int
+    customer: str
+    notes: str
+    lines: list[Line]
+
+
+class DictCodec(CacheCodec):
+    """Serialization used before codecs"""
+
+    def encode(self, value):
+        return orjson.dumps(value.model_dump(mode="json"))
+
+    def decode(self, value_type, data):
+        return value_type(**orjson.loads(data))
+
+
+def measure(codec: CacheCodec, order: Order) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = codec.encode(order)
+    encode = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        codec.decode(Order, data)
+    decode = (time.perf_counter() - start) / ROUNDS
+
+    return encode, decode, len(data)
+
+
+def main() -> None:
+    now = datetime.now(timezone.utc)
+    order = Order(
+        id=1,
+        customer="customer",
+        notes="Leave at the door. " * 50,
+        lines=[Line(sku=f"SKU-{i % 20}", quantity=i, price=i * 1.5, created_at=now) for i in range(200)],
+    )
+
+    codecs = {
+        "model_dump + orjson": DictCodec(),
+        "json": JsonCodec(),
+        "msgpack": MsgpackCodec(),
+        "json + zstd": CompressedCodec(JsonCodec(), Compression.ZSTD),
+        "json + lz4": CompressedCodec(JsonCodec(), Compression.LZ4),
+        "msgpack + zstd": CompressedCodec(MsgpackCodec(), Compression.ZSTD),
+    }
+
+    # Warm up pydantic and codec internals before timing
+    for codec in codecs.values():
+        codec.decode(Order, codec.encode(order))
+
+    results = {name: measure(codec, order) for name, codec in codecs.items()}
+    base_encode, base_decode, _ = results["model_dump + orjson"]
+    for name, (encode, decode, size) in results.items():
+        print(
+            f"{name:<20} encode {encode * 1e6:>7.1f} µs ({base_encode / encode:.2f}x)"
+            f"  decode {decode * 1e6:>7.1f} µs ({base_decode / decode:.2f}x)  {size:>6} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares per-key TypedCache.get/set with pipelined TypedCache.get_many/set_many.
+
+Runs against fakeredis TCP server by default, set REDIS__HOST to use a real Redis:
+    PYTHONPATH=src python -m benchmarks.cache_many
+"""
+
+import asyncio
+import threading
+import time
+
+from app.settings import settings
+from data.cache.config import RedisConfig
+from data.cache.redis_cache import RedisCache
+from data.cache.typed_cache import TypedCache
+from domain.cache.models.cache_model import CacheModel
+
+KEYS = 200
+ROUNDS = 20
+
+
+class Item(CacheModel):
+    id: int
+    title: str
+
+
+def start_fake_redis() -> str:
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    # Connection handlers must not keep the process alive after the benchmark
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"{host}:{port}"
+
+
+async def main() -> None:
+    if settings.redis is None:
+        settings.redis = RedisConfig(host=start_fake_redis())
+
+    redis_cache = RedisCache()
+    cache = TypedCache(Item, redis_cache)
+    items = {f"benchmark:item:{i}": Item(id=i, title="x" * 100) for i in range(KEYS)}
+    keys = list(items)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for key, item in items.items():
+            await cache.set(key, item)
+        for key in keys:
+            await cache.get(key)
+    single = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await cache.set_many(items)
+        await cache.get_many(keys)
+    batched = (time.perf_counter() - start) / ROUNDS
+
+    print(f"get/set:           {single * 1000:>8.2f} ms per {KEYS} keys")
+    print(f"get_many/set_many: {batched * 1000:>8.2f} ms per {KEYS} keys ({single / batched:.1f}x)")
+
+    await cache.delete_many(keys)
+    await redis_cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
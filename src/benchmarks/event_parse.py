@@ -0,0 +1,96 @@
+"""
+Compares decoding AMQP message bodies into events through dicts (orjson.loads + payload model + Event)
+with EventParser, which validates the raw body with cached TypeAdapters.
+
+Needs no services:
+    PYTHONPATH=src python -m benchmarks.event_parse
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import di
+import orjson
+from app.bootstrap import lifespan
+from domain.events.controllable_message import ControllableMessage
+from domain.events.datasources.events import EventsDatasource
+from domain.events.handler import EventHandler
+from domain.events.models.event import Event
+from domain.events.parser import EventParser
+from domain.events.registry import EventHandlerRegistry
+from domain.tasks.models.task_payload import TaskPayload
+from pydantic import BaseModel
+from tests.events_datasource_test_impl import TestEventsDatasource
+from tests.rabbitmq_test_impl import TestQueueControlInterface
+
+MESSAGES = 50_000
+
+
+class OrderLine(BaseModel):
+    sku: str
+    quantity: int
+    price: float
+
+
+class OrderCreated(TaskPayload):
+    __event_name__ = "benchmark_order_created"
+
+    order_id: str
+    customer_id: str
+    created_at: datetime
+    lines: list[OrderLine]
+    comment: str | None = None
+
+
+class OrderCreatedHandler(EventHandler[OrderCreated]):
+    async def handle(self, event: Event[OrderCreated]):
+        pass
+
+
+async def main() -> None:
+    async with lifespan():
+        di.container.register(EventsDatasource, instance=TestEventsDatasource())
+        di.container.register(OrderCreatedHandler)
+
+        registry = EventHandlerRegistry([OrderCreatedHandler])
+        parser = EventParser(registry)
+        control = TestQueueControlInterface()
+        bodies = [
+            orjson.dumps(
+                {
+                    "id": str(uuid4()),
+                    "event": OrderCreated.__event_name__,
+                    "timestamp": time.time(),
+                    "rollback": False,
+                    "data": {
+                        "order_id": str(uuid4()),
+                        "customer_id": str(uuid4()),
+                        "created_at": datetime.now().isoformat(),
+                        "lines": [{"sku": f"sku-{line}", "quantity": line, "price": 9.99} for line in range(5)],
+                        "comment": "x" * 100,
+                    },
+                }
+            )
+            for _ in range(MESSAGES)
+        ]
+
+        start = time.perf_counter()
+        for body in bodies:
+            data = orjson.loads(body)
+            event_type = registry.get_event(data["event"])
+            Event(id=data["id"], event=data["event"], timestamp=data["timestamp"], data=event_type(**data["data"]))
+        dicts = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for body in bodies:
+            parser.parse(ControllableMessage(body, control))
+        adapters = time.perf_counter() - start
+
+        print(f"orjson + models: {MESSAGES / dicts:>10,.0f} msg/s")
+        print(f"TypeAdapter:     {MESSAGES / adapters:>10,.0f} msg/s ({dicts / adapters:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Compares a new httpx.AsyncClient per request (the previous HttpClientImpl behaviour)
+with the shared pooled client of HttpClientImpl against a local stub ASGI server.
+
+Needs no services:
+    PYTHONPATH=src python -m benchmarks.http_client
+"""
+
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+import httpx
+import uvicorn
+from app.settings import settings
+from data.network.http_client_impl import HttpClientImpl
+
+HOST = "127.0.0.1"
+PORT = 8765
+REQUESTS = 2_000
+CONCURRENCY = 20
+
+
+async def stub_app(scope, receive, send) -> None:
+    if scope["type"] != "http":
+        return
+
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"status": "ok"}'})
+
+
+async def measure(name: str, get: Callable[[str], Awaitable[httpx.Response]]) -> None:
+    url = f"http://{HOST}:{PORT}/"
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await get(url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request() for _ in range(REQUESTS)])
+    elapsed = time.perf_counter() - start
+
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print(f"{name}: {REQUESTS / elapsed:>8,.0f} req/s, p99 {p99 * 1000:>6.1f} ms")
+
+
+async def main() -> None:
+    server = uvicorn.Server(uvicorn.Config(stub_app, host=HOST, port=PORT, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    async def client_per_request(url: str) -> httpx.Response:
+        async with httpx.AsyncClient(timeout=10) as client:
+            r = await client.get(url)
+            r.raise_for_status()
+            return r
+
+    http_client = HttpClientImpl(settings)
+
+    await measure("client per request", client_per_request)
+    await measure("shared client     ", http_client.get)
+    print(f"pool: {http_client.pool_stats()}")
+
+    await http_client.close()
+    server.should_exit = True
+    await serve
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
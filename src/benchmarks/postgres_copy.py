@@ -0,0 +1,73 @@
+"""
+Compares executemany with streaming rows through COPY: inserts (copy_records_to_table)
+and upserts through a temp table (upsert_records) against INSERT ... ON CONFLICT executemany.
+
+Needs Postgres, creates and drops the benchmark_copy table:
+    POSTGRES__DSN=postgresql://postgres@localhost/postgres PYTHONPATH=src python -m benchmarks.postgres_copy [rows]
+"""
+
+import asyncio
+import sys
+import time
+from typing import AsyncIterator
+
+from app.settings import settings
+from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+
+async def rows(count: int) -> AsyncIterator[tuple]:
+    for i in range(count):
+        yield i, f"item {i}", i * 0.5
+
+
+async def main() -> None:
+    assert settings.postgres, "Set POSTGRES__DSN"
+    db = AsyncpgPostgresDatabase()
+    await db.init(settings.postgres)
+    await db.execute("DROP TABLE IF EXISTS benchmark_copy")
+    await db.execute("CREATE TABLE benchmark_copy (id bigint PRIMARY KEY, title text NOT NULL, price float8 NOT NULL)")
+
+    try:
+        records = [record async for record in rows(ROWS)]
+        start = time.perf_counter()
+        async with db.transaction():
+            await db.executemany("INSERT INTO benchmark_copy (id, title, price) VALUES ($1, $2, $3)", records)
+        executemany = time.perf_counter() - start
+        del records
+
+        await db.execute("TRUNCATE benchmark_copy")
+        start = time.perf_counter()
+        await db.copy_records_to_table("benchmark_copy", records=rows(ROWS), columns=["id", "title", "price"])
+        copy = time.perf_counter() - start
+
+        # Every row conflicts from now on, so all of them are updated
+        records = [record async for record in rows(ROWS)]
+        start = time.perf_counter()
+        async with db.transaction():
+            await db.executemany(
+                "INSERT INTO benchmark_copy (id, title, price) VALUES ($1, $2, $3) "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, price = EXCLUDED.price",
+                records,
+            )
+        executemany_upsert = time.perf_counter() - start
+        del records
+
+        start = time.perf_counter()
+        await db.upsert_records(
+            "benchmark_copy", records=rows(ROWS), columns=["id", "title", "price"], conflict_columns=["id"]
+        )
+        upsert = time.perf_counter() - start
+    finally:
+        await db.execute("DROP TABLE benchmark_copy")
+        await db.close()
+
+    print(f"insert executemany: {executemany:>7.2f} s per {ROWS} rows")
+    print(f"insert COPY:        {copy:>7.2f} s per {ROWS} rows ({executemany / copy:.1f}x)")
+    print(f"upsert executemany: {executemany_upsert:>7.2f} s per {ROWS} rows")
+    print(f"upsert COPY:        {upsert:>7.2f} s per {ROWS} rows ({executemany_upsert / upsert:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Streams rows with AsyncpgPostgresDatabase.cursor without prefetch (the previous behaviour), with prefetch
+of the next page, and page by page with cursor_pages. Reports throughput and peak RSS growth.
+
+Needs Postgres, rows are generated by the query. RSS is read from /proc, so Linux only:
+    POSTGRES__DSN=postgresql://postgres@localhost/postgres PYTHONPATH=src python -m benchmarks.postgres_cursor [rows]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable
+
+from app.settings import settings
+from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+STEP = 2_000
+QUERY = "SELECT i, md5(i::text) AS title FROM generate_series(1, $1::bigint) i"
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def measure(consume: Callable[[], Awaitable[int]]) -> tuple[float, int]:
+    """Returns rows per second and peak RSS growth in bytes"""
+    baseline = peak = rss()
+    done = False
+
+    async def sample() -> None:
+        nonlocal peak
+        while not done:
+            peak = max(peak, rss())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample())
+    start = time.perf_counter()
+    count = await consume()
+    elapsed = time.perf_counter() - start
+    done = True
+    await sampler
+
+    assert count == ROWS
+    return count / elapsed, peak - baseline
+
+
+async def main() -> None:
+    assert settings.postgres, "Set POSTGRES__DSN"
+    db = AsyncpgPostgresDatabase()
+    await db.init(settings.postgres)
+
+    # Consumer does a bit of work per row, which prefetch overlaps with fetching the next page
+    async def rows(prefetch: bool) -> int:
+        count = 0
+        async for row in db.cursor(QUERY, ROWS, step=STEP, prefetch=prefetch):
+            count += len(row["title"]) // 32
+        return count
+
+    async def pages() -> int:
+        count = 0
+        async for page in db.cursor_pages(QUERY, ROWS, step=STEP, prefetch=True):
+            count += sum(len(row["title"]) for row in page) // 32
+        return count
+
+    try:
+        results = {
+            "rows, no prefetch": await measure(lambda: rows(prefetch=False)),
+            "rows, prefetch": await measure(lambda: rows(prefetch=True)),
+            "pages, prefetch": await measure(pages),
+        }
+    finally:
+        await db.close()
+
+    base = results["rows, no prefetch"][0]
+    for name, (throughput, memory) in results.items():
+        print(f"{name:<18} {throughput:>10,.0f} rows/s ({throughput / base:.2f}x)  peak RSS +{memory / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Compares building a Query on every call with a CompiledQuery built once: CPU time per call, and with
+Postgres also the latency of a call with no statement cache, with the asyncpg statement cache,
+through the prepared statement of a registered CompiledQuery, and of the first call on a new connection.
+
+CPU part needs no services, set POSTGRES__DSN for the latency part:
+    POSTGRES__DSN=postgresql://postgres@localhost/postgres PYTHONPATH=src python -m benchmarks.query_compile
+"""
+
+import asyncio
+import time
+
+from app.settings import settings
+from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase
+from data.storage.postgres.compiled_query import prepared_statements
+from data.storage.postgres.config import PostgresConfig
+from data.storage.postgres.parameters import Parameters
+from data.storage.postgres.query_builder import Query
+
+CALLS = 100_000
+QUERIES = 5_000
+
+
+def build_query(parameters: Parameters, oid: int, kind: str) -> str:
+    return str(
+        Query()
+        .SELECT("c.relname", "n.nspname", "c.reltuples")
+        .FROM("pg_class c")
+        .INNER_JOIN("pg_namespace n")
+        .ON("n.oid = c.relnamespace")
+        .WHERE(f"c.oid = {parameters.add(oid)}", f"c.relkind::text = {parameters.add(kind)}")
+        .ORDER_BY("c.relname")
+    )
+
+
+COMPILED = prepared_statements.register(
+    Query()
+    .SELECT("c.relname", "n.nspname", "c.reltuples")
+    .FROM("pg_class c")
+    .INNER_JOIN("pg_namespace n")
+    .ON("n.oid = c.relnamespace")
+    .WHERE("c.oid = :oid", "c.relkind::text = :kind")
+    .ORDER_BY("c.relname")
+    .compile()
+)
+
+
+def cpu() -> None:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        parameters = Parameters()
+        build_query(parameters, 1259, "r")
+        list(parameters)
+    built = (time.perf_counter() - start) / CALLS
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        list(COMPILED.parameters(oid=1259, kind="r"))
+    compiled = (time.perf_counter() - start) / CALLS
+
+    print(f"build Query per call:  {built * 1e6:>7.2f} µs")
+    print(f"CompiledQuery:         {compiled * 1e6:>7.2f} µs ({built / compiled:.0f}x)")
+
+
+async def latency(config: PostgresConfig) -> None:
+    async def run(db: AsyncpgPostgresDatabase, compiled: bool) -> float:
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            if compiled:
+                await db.fetch(COMPILED, *COMPILED.parameters(oid=1259, kind="r"))
+            else:
+                parameters = Parameters()
+                await db.fetch(build_query(parameters, 1259, "r"), *parameters)
+        return (time.perf_counter() - start) / QUERIES
+
+    results = {}
+    for name, statement_cache_size, compiled in [
+        ("no statement cache, build per call", 0, False),
+        ("statement cache, build per call", 100, False),
+        ("prepared CompiledQuery", 100, True),
+    ]:
+        db = AsyncpgPostgresDatabase()
+        await db.init(config.model_copy(update={"min_size": 1, "statement_cache_size": statement_cache_size}))
+        results[name] = await run(db, compiled)
+        await db.close()
+
+    base = results["no statement cache, build per call"]
+    for name, elapsed in results.items():
+        print(f"{name:<36} {elapsed * 1e6:>7.1f} µs per query ({base / elapsed:.2f}x)")
+
+    async def first_call(compiled: bool) -> float:
+        db = AsyncpgPostgresDatabase()
+        await db.init(config.model_copy(update={"min_size": 1}))
+        start = time.perf_counter()
+        if compiled:
+            await db.fetch(COMPILED, *COMPILED.parameters(oid=1259, kind="r"))
+        else:
+            parameters = Parameters()
+            await db.fetch(build_query(parameters, 1259, "r"), *parameters)
+        elapsed = time.perf_counter() - start
+        await db.close()
+        return elapsed
+
+    # Registered queries are prepared by the pool init hook, before the connection is handed out
+    print(f"first call, build per call:          {await first_call(False) * 1e6:>7.1f} µs")
+    print(f"first call, prepared on init:        {await first_call(True) * 1e6:>7.1f} µs")
+
+
+if __name__ == "__main__":
+    cpu()
+    if settings.postgres:
+        asyncio.run(latency(settings.postgres))
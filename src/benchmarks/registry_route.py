@@ -0,0 +1,70 @@
+"""
+Compares per-event routing overhead of looking handlers up and wrapping them with di.resolve on every event
+with the routing table of EventHandlerRegistry, which keeps the factories. Handlers are created per event
+in both cases, so most of the time is the DI resolution itself.
+
+Needs no services:
+    PYTHONPATH=src python -m benchmarks.registry_route
+"""
+
+import asyncio
+import logging
+import time
+
+import di
+from app.bootstrap import lifespan
+from domain.events.controllable_event import ControllableEvent
+from domain.events.datasources.events import EventsDatasource
+from domain.events.handler import EventHandler
+from domain.events.models.event import Event
+from domain.events.registry import EventHandlerRegistry
+from domain.tasks.models.task_payload import TaskPayload
+from tests.events_datasource_test_impl import TestEventsDatasource
+from tests.rabbitmq_test_impl import TestQueueControlInterface
+
+EVENTS = 100_000
+
+
+class BenchmarkTask(TaskPayload):
+    __event_name__ = "benchmark_task"
+
+    value: int
+
+
+class BenchmarkHandler(EventHandler[BenchmarkTask]):
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    async def handle(self, event: Event[BenchmarkTask]):
+        pass
+
+
+async def main() -> None:
+    async with lifespan():
+        di.container.register(EventsDatasource, instance=TestEventsDatasource())
+        di.container.register(BenchmarkHandler)
+
+        registry = EventHandlerRegistry([BenchmarkHandler])
+        event = ControllableEvent(
+            Event[BenchmarkTask](id="1", event=BenchmarkTask.__event_name__, data=BenchmarkTask(value=1), timestamp=0),
+            TestQueueControlInterface(),
+        )
+
+        start = time.perf_counter()
+        for _ in range(EVENTS):
+            for config in registry.handlers[event.event.event]:
+                handler: EventHandler = di.resolve(config.handler)()
+                await registry.processor.handle(handler, event)
+        resolved = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(EVENTS):
+            await registry._handle(event)
+        table = time.perf_counter() - start
+
+        print(f"resolve per event: {resolved / EVENTS * 1e6:>8.2f} us/event")
+        print(f"routing table:     {table / EVENTS * 1e6:>8.2f} us/event ({resolved / table:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import abc
+import enum
+from typing import Type, TypeVar
+
+from pydantic import BaseModel
+
+TModel = TypeVar("TModel", bound=BaseModel)
+
+
+class CacheCodec(abc.ABC):
+    @abc.abstractmethod
+    def encode(self, value: BaseModel) -> bytes: ...
+
+    @abc.abstractmethod
+    def decode(self, value_type: Type[TModel], data: bytes) -> TModel: ...
+
+
+class JsonCodec(CacheCodec):
+    """Pydantic JSON straight from and to bytes, without intermediate Python objects"""
+
+    def encode(self, value: BaseModel) -> bytes:
+        # model_dump_json() would decode the same bytes to str
+        return value.__pydantic_serializer__.to_json(value)
+
+    def decode(self, value_type: Type[TModel], data: bytes) -> TModel:
+        return value_type.model_validate_json(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """Smaller than JSON for numeric data, requires msgpack"""
+
+    def __init__(self):
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def encode(self, value: BaseModel) -> bytes:
+        return self._msgpack.packb(value.model_dump(mode="json"))
+
+    def decode(self, value_type: Type[TModel], data: bytes) -> TModel:
+        return value_type.model_validate(self._msgpack.unpackb(data))
+
+
+class Compression(str, enum.Enum):
+    ZSTD = "zstd"
+    LZ4 = "lz4"
+
+
+class CompressedCodec(CacheCodec):
+    """
+    Compresses values encoded by codec if they are larger than threshold, requires zstandard or lz4.
+
+    Every value is prefixed with one byte telling whether it's compressed.
+    """
+
+    _RAW = b"\x00"
+    _COMPRESSED = b"\x01"
+
+    def __init__(self, codec: CacheCodec, compression: Compression = Compression.ZSTD, threshold: int = 1024):
+        self._codec = codec
+        self.threshold = threshold
+
+        match compression:
+            case Compression.ZSTD:
+                import zstandard
+
+                self._compress = zstandard.ZstdCompressor().compress
+                self._decompress = zstandard.ZstdDecompressor().decompress
+            case Compression.LZ4:
+                import lz4.frame
+
+                self._compress = lz4.frame.compress
+                self._decompress = lz4.frame.decompress
+
+    def encode(self, value: BaseModel) -> bytes:
+        data = self._codec.encode(value)
+        if len(data) < self.threshold:
+            return self._RAW + data
+
+        return self._COMPRESSED + self._compress(data)
+
+    def decode(self, value_type: Type[TModel], data: bytes) -> TModel:
+        header, payload = data[:1], data[1:]
+        if header == self._COMPRESSED:
+            payload = self._decompress(payload)
+
+        return self._codec.decode(value_type, payload)
@@ -3,3 +3,11 @@ from pydantic import BaseModel
 
 class RedisConfig(BaseModel):
     host: str
+
+    max_connections: int = 50
+    # Seconds to wait for a free connection when all max_connections are in use, then ConnectionError is raised
+    pool_timeout: float = 5.0
+    socket_timeout: float = 5.0
+    socket_connect_timeout: float = 5.0
+    # Connections idle for longer are checked with PING before use, 0 disables checks
+    health_check_interval: int = 30
@@ -1,28 +1,45 @@
-from typing import Any
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Mapping
+from uuid import uuid4
 
-import orjson
 import redis.asyncio as redis
 from app.settings import settings
 from domain.cache.cache import Cache
 from domain.environment.env import Env
+from redis.exceptions import WatchError
+
+CLEAR_BATCH_SIZE = 500
+
+
+@dataclass
+class RedisPoolStats:
+    max_connections: int
+    in_use: int
+    idle: int
 
 
 class RedisCache(Cache):
     def __init__(self):
         self._connection = None
+        self._init_lock = asyncio.Lock()
+
+    async def init(self) -> None:
+        """Creates the connection pool and checks that Redis is reachable, otherwise it's created on first use"""
+        await self._init()
+        await self._connection.ping()
 
-    async def set(self, key: str, value: Any, ttl: int) -> None:
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
         if not self._connection:
             await self._init()
 
-        await self._connection.set(name=key, value=orjson.dumps(value.model_dump(mode="json")), ex=ttl)
+        await self._connection.set(name=key, value=value, ex=ttl)
 
-    async def get(self, key: str) -> Any:
+    async def get(self, key: str) -> bytes | None:
         if not self._connection:
             await self._init()
 
-        value = await self._connection.get(key)
-        return orjson.loads(value) if value is not None else None
+        return await self._connection.get(key)
 
     async def delete(self, key: str) -> None:
         if not self._connection:
@@ -30,24 +47,175 @@ class RedisCache(Cache):
 
         await self._connection.delete(key)
 
-    async def clear(self):
+    async def get_with_ttl(self, key: str) -> tuple[bytes | None, float | None]:
+        if not self._connection:
+            await self._init()
+
+        async with self._connection.pipeline(transaction=False) as pipe:
+            value, pttl = await pipe.get(key).pttl(key).execute()
+
+        if value is None:
+            return None, None
+
+        # PTTL is negative for keys without expiration
+        return value, pttl / 1000 if pttl >= 0 else None
+
+    async def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+
+        if not self._connection:
+            await self._init()
+
+        values = await self._connection.mget(keys)
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def get_many_with_ttl(self, keys: list[str]) -> dict[str, tuple[bytes, float | None]]:
+        """Same as get_many, values come with their remaining ttl in seconds"""
+        if not keys:
+            return {}
+
         if not self._connection:
+            await self._init()
+
+        async with self._connection.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *pttls = await pipe.execute()
+
+        return {
+            key: (value, pttl / 1000 if pttl >= 0 else None)
+            for key, value, pttl in zip(keys, values, pttls)
+            if value is not None
+        }
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: int) -> None:
+        if not items:
             return
 
-        if settings.env not in [Env.PYTEST]:
+        if not self._connection:
+            await self._init()
+
+        # MSET has no expiration, so SETs are pipelined to be sent in one round trip
+        async with self._connection.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(name=key, value=value, ex=ttl)
+            await pipe.execute()
+
+    async def delete_many(self, keys: list[str]) -> None:
+        if not keys:
             return
 
-        keys = await self._connection.keys()
-        if keys:
-            await self._connection.delete(*keys)
+        if not self._connection:
+            await self._init()
+
+        await self._connection.delete(*keys)
+
+    async def lock(self, key: str, ttl: float) -> str | None:
+        if not self._connection:
+            await self._init()
+
+        token = uuid4().hex
+        acquired = await self._connection.set(name=key, value=token, px=max(1, int(ttl * 1000)), nx=True)
+        return token if acquired else None
+
+    async def unlock(self, key: str, token: str) -> None:
+        if not self._connection:
+            await self._init()
+
+        # Lock could have expired and been taken by someone else, so it's deleted only if the token matches
+        async with self._connection.pipeline() as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+            except WatchError:
+                pass
+
+    async def incr(self, key: str) -> int:
+        if not self._connection:
+            await self._init()
+
+        return await self._connection.incr(key)
+
+    async def clear(self, namespace: str | None = None):
+        if namespace is None:
+            if not self._connection:
+                return
+
+            if settings.env not in [Env.PYTEST]:
+                return
+        elif not self._connection:
+            await self._init()
+
+        # SCAN and UNLINK in bounded batches don't block Redis like KEYS and a single DEL do
+        pattern = f"{namespace}:*" if namespace else None
+        batch = []
+        async for key in self._connection.scan_iter(match=pattern, count=CLEAR_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= CLEAR_BATCH_SIZE:
+                await self._connection.unlink(*batch)
+                batch = []
+
+        if batch:
+            await self._connection.unlink(*batch)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        if not self._connection:
+            await self._init()
+
+        await self._connection.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Yields messages published to channel, an empty message marks that the subscription is active"""
+        if not self._connection:
+            await self._init()
+
+        async with self._connection.pubsub() as pubsub:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    yield b""
+                elif message["type"] == "message":
+                    yield message["data"]
+
+    def pool_stats(self) -> RedisPoolStats | None:
+        if not self._connection:
+            return None
+
+        # redis-py has no public API for pool usage
+        pool = self._connection.connection_pool
+        return RedisPoolStats(
+            max_connections=pool.max_connections,
+            in_use=len(pool._in_use_connections),
+            idle=len(pool._available_connections),
+        )
 
     async def close(self) -> None:
         if self._connection:
-            await self._connection.close()
+            await self._connection.aclose()
             self._connection = None
 
     async def _init(self):
-        assert settings.redis
+        # Concurrent first calls must share one pool
+        async with self._init_lock:
+            if self._connection:
+                return
+
+            config = settings.redis
+            assert config
 
-        pool = redis.ConnectionPool.from_url(f"redis://{settings.redis.host}?encoding=utf-8")
-        self._connection = redis.Redis(connection_pool=pool, auto_close_connection_pool=True)
+            # Default pool of redis-py 5 allows 2**31 connections, so a burst would open one per concurrent call.
+            # Bounded blocking pool makes callers wait for a free connection, and fail after pool_timeout
+            pool = redis.BlockingConnectionPool.from_url(
+                f"redis://{config.host}?encoding=utf-8",
+                max_connections=config.max_connections,
+                timeout=config.pool_timeout,
+                socket_timeout=config.socket_timeout,
+                socket_connect_timeout=config.socket_connect_timeout,
+                health_check_interval=config.health_check_interval,
+            )
+            self._connection = redis.Redis.from_pool(pool)
@@ -0,0 +1,43 @@
+import datetime
+
+import orjson
+import pytest
+from data.cache.codec import CompressedCodec, Compression, JsonCodec, MsgpackCodec
+from domain.cache.models.cache_model import CacheModel
+
+
+class Item(CacheModel):
+    id: int
+    title: str
+    created_at: datetime.datetime
+
+
+item = Item(id=1, title="x" * 2000, created_at=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "codec",
+    [
+        JsonCodec(),
+        MsgpackCodec(),
+        CompressedCodec(JsonCodec(), Compression.ZSTD),
+        CompressedCodec(MsgpackCodec(), Compression.LZ4),
+    ],
+)
+def test_round_trip(codec):
+    assert codec.decode(Item, codec.encode(item)) == item
+
+
+@pytest.mark.unit
+def test_json_reads_previous_format():
+    assert JsonCodec().decode(Item, orjson.dumps(item.model_dump(mode="json"))) == item
+
+
+@pytest.mark.unit
+def test_compression_threshold():
+    codec = CompressedCodec(JsonCodec(), threshold=1024)
+    small = item.model_copy(update={"title": "x"})
+
+    assert codec.encode(small) == b"\x00" + JsonCodec().encode(small)
+    assert len(codec.encode(item)) < len(JsonCodec().encode(item))
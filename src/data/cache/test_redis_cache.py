@@ -33,3 +33,195 @@
 #
 #     value = await cache.get(cache_key)
 #     assert value is None
+
+import asyncio
+
+import fakeredis
+import pytest
+from app.settings import settings
+from data.cache.config import RedisConfig
+from data.cache.redis_cache import RedisCache, RedisPoolStats
+from data.cache.typed_cache import TypedCache
+from domain.cache.models.cache_model import CacheModel
+
+
+class Item(CacheModel):
+    value: str
+
+
+@pytest.fixture
+async def redis_cache() -> RedisCache:
+    cache = RedisCache()
+    cache._connection = fakeredis.FakeAsyncRedis()
+    yield cache
+    await cache.close()
+
+
+class Loader:
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> Item:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Item(value=str(self.calls))
+
+
+@pytest.mark.unit
+async def test_many(redis_cache):
+    await redis_cache.set_many({"a": b"1", "b": b"2"}, ttl=10)
+
+    assert await redis_cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert await redis_cache._connection.ttl("a") == 10
+
+    await redis_cache.delete_many(["a", "c"])
+    assert await redis_cache.get_many(["a", "b"]) == {"b": b"2"}
+
+    assert await redis_cache.get_many([]) == {}
+
+
+@pytest.mark.unit
+async def test_typed_many(redis_cache):
+    cache = TypedCache(Item, redis_cache)
+
+    await cache.set_many({"a": Item(value="1"), "b": Item(value="2")})
+    assert await cache.get_many(["a", "b", "c"]) == {"a": Item(value="1"), "b": Item(value="2")}
+
+    await cache.delete_many(["b"])
+    assert await cache.get_many(["a", "b"]) == {"a": Item(value="1")}
+
+
+@pytest.mark.unit
+async def test_lock(redis_cache):
+    token = await redis_cache.lock("lock", ttl=10)
+    assert token is not None
+    assert await redis_cache.lock("lock", ttl=10) is None
+
+    await redis_cache.unlock("lock", "other token")
+    assert await redis_cache.lock("lock", ttl=10) is None
+
+    await redis_cache.unlock("lock", token)
+    assert await redis_cache.lock("lock", ttl=10) is not None
+
+
+@pytest.mark.unit
+async def test_get_with_ttl(redis_cache):
+    assert await redis_cache.get_with_ttl("a") == (None, None)
+
+    await redis_cache.set("a", b"1", ttl=10)
+    value, ttl = await redis_cache.get_with_ttl("a")
+
+    assert value == b"1"
+    assert 9 < ttl <= 10
+
+
+@pytest.mark.unit
+async def test_get_or_set_loads_once(redis_cache):
+    cache = TypedCache(Item, redis_cache)
+    loader = Loader()
+
+    values = await asyncio.gather(*(cache.get_or_set("a", loader) for _ in range(20)))
+
+    assert loader.calls == 1
+    assert values == [Item(value="1")] * 20
+    assert await cache.get("a") == Item(value="1")
+    assert cache._key_locks == {}
+
+
+@pytest.mark.unit
+async def test_get_or_set_loads_once_across_processes():
+    server = fakeredis.FakeServer()
+    caches = []
+    for _ in range(3):
+        redis_cache = RedisCache()
+        redis_cache._connection = fakeredis.FakeAsyncRedis(server=server)
+        caches.append(TypedCache(Item, redis_cache))
+    loader = Loader()
+
+    values = await asyncio.gather(*(cache.get_or_set("a", loader) for cache in caches for _ in range(5)))
+
+    assert loader.calls == 1
+    assert values == [Item(value="1")] * 15
+
+
+@pytest.mark.unit
+async def test_get_or_set_early_refresh(redis_cache):
+    cache = TypedCache(Item, redis_cache)
+    loader = Loader(delay=0)
+
+    await cache.get_or_set("a", loader)
+    assert await cache.get_or_set("a", loader) == Item(value="1")
+
+    # Loader as slow as the ttl makes refresh almost certain
+    cache._load_time = Item.ttl() * 100
+    assert await cache.get_or_set("a", loader) == Item(value="2")
+    assert loader.calls == 2
+
+
+@pytest.mark.unit
+async def test_get_or_set_serves_value_while_refreshing(redis_cache):
+    cache = TypedCache(Item, redis_cache)
+    await cache.set("a", Item(value="old"))
+    cache._load_time = Item.ttl() * 100
+
+    lock_key = f"{await cache._key('a')}:lock"
+    token = await redis_cache.lock(lock_key, ttl=10)
+    assert await cache.get_or_set("a", Loader()) == Item(value="old")
+
+    await redis_cache.unlock(lock_key, token)
+
+
+class OtherItem(CacheModel):
+    cache_version = 2
+
+    value: str
+
+
+@pytest.mark.unit
+async def test_clear_namespace(redis_cache, monkeypatch):
+    monkeypatch.setattr("data.cache.redis_cache.CLEAR_BATCH_SIZE", 3)
+    items = TypedCache(Item, redis_cache)
+    others = TypedCache(OtherItem, redis_cache)
+
+    await items.set_many({str(i): Item(value=str(i)) for i in range(10)})
+    await others.set("0", OtherItem(value="0"))
+    assert await redis_cache.get("OtherItem:v2:0:0") is not None
+
+    await items.clear()
+
+    assert await items.get_many([str(i) for i in range(10)]) == {}
+    assert await others.get("0") == OtherItem(value="0")
+
+
+@pytest.mark.unit
+async def test_invalidate(redis_cache):
+    cache = TypedCache(Item, redis_cache)
+    other_process = TypedCache(Item, redis_cache, generation_ttl=0)
+    await cache.set("a", Item(value="1"))
+    assert await other_process.get("a") == Item(value="1")
+
+    await cache.invalidate()
+
+    assert await cache.get("a") is None
+    assert await other_process.get("a") is None
+    await other_process.set("a", Item(value="2"))
+    assert await cache.get("a") == Item(value="2")
+
+
+@pytest.mark.unit
+async def test_concurrent_init_creates_one_pool(monkeypatch):
+    monkeypatch.setattr(settings, "redis", RedisConfig(host="localhost:6379", max_connections=7))
+    cache = RedisCache()
+    assert cache.pool_stats() is None
+
+    # Pool connects lazily, so no Redis is needed to create it
+    await asyncio.gather(*(cache._init() for _ in range(10)))
+    connection = cache._connection
+    await cache._init()
+
+    assert cache._connection is connection
+    assert cache.pool_stats() == RedisPoolStats(max_connections=7, in_use=0, idle=0)
+    assert connection.connection_pool.connection_kwargs["health_check_interval"] == 30
+
+    await cache.close()
@@ -0,0 +1,140 @@
+import asyncio
+
+import fakeredis
+import pytest
+from data.cache.redis_cache import RedisCache
+from data.cache.tiered_cache import TieredCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+async def make_cache():
+    server = fakeredis.FakeServer()
+    caches: list[TieredCache] = []
+
+    async def make(**kwargs) -> TieredCache:
+        redis_cache = RedisCache()
+        redis_cache._connection = fakeredis.FakeAsyncRedis(server=server)
+        cache = TieredCache(redis_cache, **kwargs)
+        caches.append(cache)
+
+        cache._local_enabled()
+        await asyncio.wait_for(cache._subscribed.wait(), 1)
+        return cache
+
+    yield make
+
+    for cache in caches:
+        await cache.close()
+
+
+@pytest.mark.unit
+async def test_local_hits(make_cache):
+    cache = await make_cache()
+    await cache.set("a", b"1", ttl=10)
+
+    await cache._delegate.delete("a")  # local tier serves the value without Redis
+    assert await cache.get("a") == b"1"
+    assert await cache.get("b") is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.unit
+async def test_local_ttl(make_cache):
+    clock = Clock()
+    cache = await make_cache(ttl=5, clock=clock)
+    await cache.set("a", b"1", ttl=10)
+    await cache._delegate.delete("a")
+
+    clock.now = 5
+    assert await cache.get("a") is None
+
+
+@pytest.mark.unit
+async def test_local_ttl_is_capped_by_redis_ttl(make_cache):
+    clock = Clock()
+    cache = await make_cache(ttl=60, clock=clock)
+    await cache._delegate.set("a", b"1", ttl=5)
+    await cache._delegate.set("b", b"2", ttl=5)
+    await cache._delegate.set("c", b"3", ttl=100)
+
+    assert await cache.get("a") == b"1"
+    assert await cache.get_many(["b", "c"]) == {"b": b"2", "c": b"3"}
+    await cache._delegate.delete_many(["a", "b", "c"])
+
+    clock.now = 5
+    assert await cache.get("a") is None
+    assert await cache.get_many(["b", "c"]) == {"c": b"3"}
+
+
+@pytest.mark.unit
+async def test_eviction(make_cache):
+    cache = await make_cache(max_entries=2)
+    await cache.set_many({"a": b"1", "b": b"2"}, ttl=10)
+    await cache.get("a")
+    await cache.set("c", b"3", ttl=10)
+
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats.evictions == 1
+
+    cache.max_bytes = cache.stats.bytes - 1
+    await cache.set("d", b"4", ttl=10)
+    assert list(cache._entries) == ["d"]
+
+
+@pytest.mark.unit
+async def test_get_many(make_cache):
+    cache = await make_cache()
+    await cache.set("a", b"1", ttl=10)
+    await cache._delegate.set("b", b"2", ttl=10)
+
+    assert await cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert list(cache._entries) == ["a", "b"]
+
+
+@pytest.mark.unit
+async def test_invalidation_from_other_node(make_cache):
+    node1 = await make_cache()
+    node2 = await make_cache()
+
+    await node1.set("a", b"1", ttl=10)
+    await asyncio.sleep(0.05)
+    assert await node2.get("a") == b"1"
+    assert "a" in node2._entries
+
+    await node1.delete("a")
+    await asyncio.sleep(0.05)
+
+    assert "a" not in node2._entries
+    assert await node2.get("a") is None
+
+    await node1.set("a", b"2", ttl=10)
+    await asyncio.sleep(0.05)
+    assert await node2.get("a") == b"2"
+    await node1.set("a", b"3", ttl=10)
+    await asyncio.sleep(0.05)
+    assert await node2.get("a") == b"3"
+
+
+@pytest.mark.unit
+async def test_stale_fetch_is_not_stored(make_cache):
+    cache = await make_cache()
+    await cache._delegate.set("a", b"1", ttl=10)
+
+    real_get = cache._delegate.get_with_ttl
+
+    async def get_with_invalidation(key: str):
+        value = await real_get(key)
+        cache._drop([key])  # invalidation arrives while the value is fetched
+        return value
+
+    cache._delegate.get_with_ttl = get_with_invalidation
+    assert await cache.get("a") == b"1"
+    assert "a" not in cache._entries
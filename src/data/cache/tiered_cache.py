@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Mapping
+from uuid import uuid4
+
+import di
+import orjson
+from data.cache.redis_cache import RedisCache
+from domain.cache.cache import Cache
+
+INVALIDATION_CHANNEL = "cache-invalidation"
+
+
+@dataclass
+class TieredCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+class TieredCache(Cache):
+    """
+    Bounded in-process LRU/TTL tier in front of RedisCache.
+
+    Writes and deletes are published to INVALIDATION_CHANNEL, so other processes drop their local copies.
+    Local tier is used only while the invalidation subscription is active, it's cleared when the subscription
+    is lost because invalidations could have been missed meanwhile.
+    """
+
+    def __init__(
+        self,
+        delegate: RedisCache,
+        *,
+        max_entries: int = 10000,
+        max_bytes: int | None = None,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._delegate = delegate
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+
+        # key -> (expires at, encoded value)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self.stats = TieredCacheStats()
+
+        self._origin = uuid4().hex
+        # Bumped on every invalidation, a value fetched across a bump may be stale and isn't stored locally
+        self._generation = 0
+        self._subscribed = asyncio.Event()
+        self._listener: asyncio.Task | None = None
+
+    async def get(self, key: str) -> bytes | None:
+        if self._local_enabled():
+            if (value := self._local_get(key)) is not None:
+                return value
+
+        generation = self._generation
+        value, ttl = await self._delegate.get_with_ttl(key)
+        if value is not None:
+            self._local_set(key, value, self._local_ttl(ttl), generation)
+
+        return value
+
+    async def get_with_ttl(self, key: str) -> tuple[bytes | None, float | None]:
+        # Remaining ttl is known only to Redis
+        return await self._delegate.get_with_ttl(key)
+
+    async def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        result: dict[str, bytes] = {}
+        missing = keys
+
+        if self._local_enabled():
+            missing = []
+            for key in keys:
+                if (value := self._local_get(key)) is not None:
+                    result[key] = value
+                else:
+                    missing.append(key)
+
+        generation = self._generation
+        values = await self._delegate.get_many_with_ttl(missing)
+        for key, (value, ttl) in values.items():
+            self._local_set(key, value, self._local_ttl(ttl), generation)
+
+        return result | {key: value for key, (value, _) in values.items()}
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._delegate.set(key, value, ttl)
+        await self._invalidate([key])
+
+        if self._local_enabled():
+            self._local_set(key, value, min(self.ttl, ttl), self._generation)
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: int) -> None:
+        await self._delegate.set_many(items, ttl)
+        await self._invalidate(list(items))
+
+        if self._local_enabled():
+            for key, value in items.items():
+                self._local_set(key, value, min(self.ttl, ttl), self._generation)
+
+    async def delete(self, key: str) -> None:
+        await self._delegate.delete(key)
+        await self._invalidate([key])
+
+    async def delete_many(self, keys: list[str]) -> None:
+        await self._delegate.delete_many(keys)
+        await self._invalidate(keys)
+
+    async def lock(self, key: str, ttl: float) -> str | None:
+        return await self._delegate.lock(key, ttl)
+
+    async def unlock(self, key: str, token: str) -> None:
+        await self._delegate.unlock(key, token)
+
+    async def incr(self, key: str) -> int:
+        value = await self._delegate.incr(key)
+        await self._invalidate([key])
+        return value
+
+    async def clear(self, namespace: str | None = None):
+        await self._delegate.clear(namespace)
+        # Local tier is small, so it's cleared entirely instead of being scanned for the namespace
+        await self._invalidate(None)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+        self._local_clear()
+        await self._delegate.close()
+
+    def _local_enabled(self) -> bool:
+        # Until the subscription is active every call goes to Redis
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+        return self._subscribed.is_set()
+
+    def _local_ttl(self, ttl: float | None) -> float:
+        # Local copy must not outlive the key in Redis
+        return self.ttl if ttl is None else min(self.ttl, ttl)
+
+    def _local_get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                self._local_pop(key)
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def _local_set(self, key: str, value: bytes, ttl: float, generation: int) -> None:
+        if generation != self._generation or not self._subscribed.is_set():
+            return
+
+        self._local_pop(key)
+        self._entries[key] = (self._clock() + ttl, value)
+        self._bytes += len(value)
+
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats.evictions += 1
+
+        self._update_stats()
+
+    def _local_pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+            self._update_stats()
+
+    def _local_clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        self.stats.entries = len(self._entries)
+        self.stats.bytes = self._bytes
+
+    def _drop(self, keys: list[str] | None) -> None:
+        self._generation += 1
+
+        if keys is None:
+            self._local_clear()
+        else:
+            for key in keys:
+                self._local_pop(key)
+
+    async def _invalidate(self, keys: list[str] | None) -> None:
+        self._drop(keys)
+        await self._delegate.publish(INVALIDATION_CHANNEL, orjson.dumps({"origin": self._origin, "keys": keys}))
+
+    async def _listen(self) -> None:
+        logger = di.resolve(logging.Logger)()
+
+        while True:
+            try:
+                async for message in self._delegate.subscribe(INVALIDATION_CHANNEL):
+                    if not message:
+                        self._subscribed.set()
+                        continue
+
+                    invalidation = orjson.loads(message)
+                    if invalidation["origin"] != self._origin:
+                        self._drop(invalidation["keys"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Cache invalidation subscription failed", extra={"error": e})
+
+            # Invalidations may have been missed while the subscription was down
+            self._subscribed.clear()
+            self._local_clear()
+            await asyncio.sleep(1)
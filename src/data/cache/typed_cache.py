@@ -1,5 +1,10 @@
-from typing import Generic, Type, TypeVar
+import asyncio
+import math
+import random
+import time
+from typing import Awaitable, Callable, Generic, Mapping, Type, TypeVar
 
+from data.cache.codec import CacheCodec, JsonCodec
 from domain.cache.cache import Cache
 from domain.cache.models.cache_model import CacheModel
 
@@ -7,16 +12,169 @@ TValue = TypeVar("TValue", bound=CacheModel)
 
 
 class TypedCache(Generic[TValue]):
-    def __init__(self, value_type: Type[TValue], delegate: Cache):
+    def __init__(
+        self,
+        value_type: Type[TValue],
+        delegate: Cache,
+        *,
+        codec: CacheCodec | None = None,
+        lock_timeout: float = 10.0,
+        early_refresh_beta: float = 1.0,
+        generation_ttl: float = 1.0,
+    ):
         self.value_type = value_type
         self._delegate = delegate
+        self.codec = codec or JsonCodec()
+        self.lock_timeout = lock_timeout
+        self.early_refresh_beta = early_refresh_beta
+        self.generation_ttl = generation_ttl
+
+        # Keys are stored as "<namespace>:<generation>:<key>", bumping the generation invalidates all of them
+        self.namespace = value_type.cache_namespace()
+        self._generation_key = f"cache-generation:{self.namespace}"
+        # (generation, monotonic time it was read at), other processes' bumps are seen within generation_ttl
+        self._generation: tuple[int, float] | None = None
+
+        # Last loader duration, it scales how early a value is refreshed before expiration
+        self._load_time = 0.0
+        # key -> (lock, number of callers using it)
+        self._key_locks: dict[str, tuple[asyncio.Lock, int]] = {}
 
     async def set(self, key: str, value: TValue) -> None:
-        await self._delegate.set(key, value, self.value_type.ttl())
+        await self._delegate.set(await self._key(key), self.codec.encode(value), self.value_type.ttl())
 
     async def get(self, key: str) -> TValue | None:
-        data = await self._delegate.get(key)
-        return self.value_type(**data) if data else None
+        data = await self._delegate.get(await self._key(key))
+        return self._decode(data) if data is not None else None
 
     async def delete(self, key: str) -> None:
-        await self._delegate.delete(key)
+        await self._delegate.delete(await self._key(key))
+
+    async def set_many(self, items: Mapping[str, TValue]) -> None:
+        prefix = await self._prefix()
+        encoded = {f"{prefix}{key}": self.codec.encode(value) for key, value in items.items()}
+        await self._delegate.set_many(encoded, self.value_type.ttl())
+
+    async def get_many(self, keys: list[str]) -> dict[str, TValue]:
+        prefix = await self._prefix()
+        values = await self._delegate.get_many([f"{prefix}{key}" for key in keys])
+        return {key.removeprefix(prefix): self._decode(data) for key, data in values.items()}
+
+    async def delete_many(self, keys: list[str]) -> None:
+        prefix = await self._prefix()
+        await self._delegate.delete_many([f"{prefix}{key}" for key in keys])
+
+    async def invalidate(self) -> None:
+        """Invalidates all values of the model at once, they are left to expire"""
+        generation = await self._delegate.incr(self._generation_key)
+        self._generation = (generation, time.monotonic())
+
+    async def clear(self) -> None:
+        """Deletes all values of the model, unlike invalidate it scans the keys"""
+        await self._delegate.clear(self.namespace)
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[TValue]]) -> TValue:
+        """
+        Returns cached value or stores the one returned by loader.
+
+        Only one caller across all processes runs loader for a key, the others get the current value while it's
+        refreshed or wait for the new one. Values are refreshed with a growing probability before they expire,
+        so hot keys don't expire for everyone at once.
+        """
+        key = await self._key(key)
+        data, ttl = await self._delegate.get_with_ttl(key)
+        if data is not None and not self._should_refresh(ttl):
+            return self._decode(data)
+
+        async with self._key_lock(key):
+            # Another caller of this process could have refreshed the value while we were waiting
+            data, ttl = await self._delegate.get_with_ttl(key)
+            if data is not None and not self._should_refresh(ttl):
+                return self._decode(data)
+
+            lock_key = f"{key}:lock"
+            token = await self._delegate.lock(lock_key, self.lock_timeout)
+            if token is None:
+                if data is not None:
+                    # Another process is refreshing it, current value is still valid
+                    return self._decode(data)
+
+                if (value := await self._wait_for(key)) is not None:
+                    return value
+
+            try:
+                started_at = time.monotonic()
+                value = await loader()
+                self._load_time = time.monotonic() - started_at
+
+                await self._delegate.set(key, self.codec.encode(value), self.value_type.ttl())
+                return value
+            finally:
+                if token is not None:
+                    await self._delegate.unlock(lock_key, token)
+
+    async def _key(self, key: str) -> str:
+        return f"{await self._prefix()}{key}"
+
+    async def _prefix(self) -> str:
+        if self._generation is None or time.monotonic() - self._generation[1] >= self.generation_ttl:
+            data = await self._delegate.get(self._generation_key)
+            self._generation = (int(data) if data is not None else 0, time.monotonic())
+
+        return f"{self.namespace}:{self._generation[0]}:"
+
+    def _decode(self, data: bytes) -> TValue:
+        return self.codec.decode(self.value_type, data)
+
+    def _should_refresh(self, ttl: float | None) -> bool:
+        if ttl is None:
+            return False
+
+        # Probabilistic early expiration (XFetch), 1 - random() is never 0
+        return self._load_time * self.early_refresh_beta * -math.log(1 - random.random()) >= ttl
+
+    async def _wait_for(self, key: str) -> TValue | None:
+        """Polls for the value being loaded by another process, returns None if it hasn't appeared in time"""
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            if (data := await self._delegate.get(key)) is not None:
+                return self._decode(data)
+            delay = min(delay * 2, 0.2)
+
+        return None
+
+    def _key_lock(self, key: str) -> "_KeyLock":
+        return _KeyLock(self._key_locks, key)
+
+
+class _KeyLock:
+    """Per-key asyncio.Lock which is removed from locks once nobody uses it"""
+
+    def __init__(self, locks: dict[str, tuple[asyncio.Lock, int]], key: str):
+        self._locks = locks
+        self._key = key
+
+    async def __aenter__(self) -> None:
+        lock, users = self._locks.get(self._key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[self._key] = (lock, users + 1)
+
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._release_user()
+            raise
+
+    async def __aexit__(self, *args) -> None:
+        self._locks[self._key][0].release()
+        self._release_user()
+
+    def _release_user(self) -> None:
+        lock, users = self._locks[self._key]
+        if users == 1:
+            del self._locks[self._key]
+        else:
+            self._locks[self._key] = (lock, users - 1)
@@ -3,3 +3,7 @@ from pydantic import BaseModel
 
 class EventBrokerConfig(BaseModel):
     url: str
+    channel_pool_size: int = 10
+    publish_batch_size: int = 500
+    prefetch_count: int = 100
+    queue_prefetch_count: dict[str, int] = {}
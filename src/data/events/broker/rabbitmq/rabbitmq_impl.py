@@ -1,13 +1,13 @@
-import logging
+import asyncio
 from contextlib import asynccontextmanager
 from datetime import timedelta
-from typing import AsyncGenerator, AsyncIterator
+from typing import AsyncGenerator, AsyncIterator, Collection, Sequence
 
 import aio_pika
-import di
 import orjson
 import pamqp
-from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue, AbstractRobustConnection
+from aio_pika.pool import Pool
 from app.settings import Settings
 from domain.events.broker import EventBroker
 from domain.events.controllable_message import ControllableMessage
@@ -15,72 +15,175 @@ from domain.events.processable_event import ProcessableEvent
 from domain.events.queue_control_interface import QueueControlInterface
 
 
+class RabbitMQDeliveryTracker:
+    """Delivery tags consumed from one channel which are not acked yet"""
+
+    def __init__(self) -> None:
+        self.unacked: set[int] = set()
+
+    def covered_tag(self, tags: Collection[int]) -> int | None:
+        """Returns the highest tag which can be acked with multiple=True without acking messages outside of tags"""
+        covered = None
+        for tag in sorted(self.unacked):
+            if tag not in tags:
+                break
+            covered = tag
+
+        return covered
+
+
 class RabbitMQQueueControlInterface(QueueControlInterface):
     _processed = False
 
-    def __init__(self, message: AbstractIncomingMessage, message_data: dict, broker: EventBroker, queue_name: str):
+    def __init__(
+        self,
+        message: AbstractIncomingMessage,
+        broker: "RabbitMQEventBroker",
+        queue_name: str,
+        tracker: RabbitMQDeliveryTracker | None = None,
+    ):
         self._message = message
-        self._message_data = message_data
         self._broker = broker
         self._queue_name = queue_name
+        self._tracker = tracker or RabbitMQDeliveryTracker()
 
     async def ack(self):
         if not self._processed:
             await self._message.ack()
-            self._processed = True
+            self._set_processed()
 
     async def retry(self):
         await self.delay(timedelta(seconds=5))
 
     async def delay(self, delay: timedelta):
         if not self._processed:
-            await self._broker.publish(self._queue_name, self._message_data, delay)
+            # Body is republished as received, without decoding it
+            await self._broker._publish_bodies(self._queue_name, [self._message.body], delay)
             await self._message.ack()
-            self._processed = True
+            self._set_processed()
 
+    @classmethod
+    async def ack_many(cls, controls: Sequence[QueueControlInterface]):
+        trackers: dict[RabbitMQDeliveryTracker, dict[int, RabbitMQQueueControlInterface]] = {}
+        for control in cls._unprocessed(controls):
+            trackers.setdefault(control._tracker, {})[control._message.delivery_tag] = control
 
-class RabbitMQEventBroker(EventBroker):
-    logger: logging.Logger | None = None
+        for tracker, tagged in trackers.items():
+            # One multiple ack covers the contiguous run of the channel's unacked messages,
+            # everything after a gap (e.g. a message still handled elsewhere) is acked one by one
+            covered = tracker.covered_tag(tagged)
+            if covered is not None:
+                await tagged[covered]._message.ack(multiple=True)
+
+            for tag, control in tagged.items():
+                if covered is None or tag > covered:
+                    await control._message.ack()
+                control._set_processed()
+
+    @classmethod
+    async def retry_many(cls, controls: Sequence[QueueControlInterface]):
+        await cls.delay_many(controls, timedelta(seconds=5))
 
+    @classmethod
+    async def delay_many(cls, controls: Sequence[QueueControlInterface], delay: timedelta):
+        queues: dict[tuple[RabbitMQEventBroker, str], list[RabbitMQQueueControlInterface]] = {}
+        for control in cls._unprocessed(controls):
+            queues.setdefault((control._broker, control._queue_name), []).append(control)
+
+        for (broker, queue_name), queue_controls in queues.items():
+            await broker._publish_bodies(queue_name, [control._message.body for control in queue_controls], delay)
+            await cls.ack_many(queue_controls)
+
+    @staticmethod
+    def _unprocessed(controls: Sequence[QueueControlInterface]) -> list["RabbitMQQueueControlInterface"]:
+        return [
+            control
+            for control in controls
+            if isinstance(control, RabbitMQQueueControlInterface) and not control._processed
+        ]
+
+    def _set_processed(self) -> None:
+        self._processed = True
+        self._tracker.unacked.discard(self._message.delivery_tag)
+
+
+class RabbitMQEventBroker(EventBroker):
     def __init__(self, settings: Settings):
         assert settings.broker
         self._broker_url: str = settings.broker.url
+        self._channel_pool_size: int = settings.broker.channel_pool_size
+        self._publish_batch_size: int = settings.broker.publish_batch_size
+        self._prefetch_count: int = settings.broker.prefetch_count
+        self._queue_prefetch_counts: dict[str, int] = settings.broker.queue_prefetch_count
 
-    async def listen(self, queue_name: str) -> AsyncIterator[ProcessableEvent]:
-        if self.logger is None:
-            self.logger = di.resolve(logging.Logger)()
+        self._connection: AbstractRobustConnection | None = None
+        self._connection_lock = asyncio.Lock()
+        self._channel_pool: Pool[AbstractChannel] | None = None
+        # Queues (and delay queues with their bindings) already declared by this process
+        self._declared_queues: set[str] = set()
 
-        async with self._channel() as channel:
+    async def listen(self, queue_name: str, prefetch_count: int | None = None) -> AsyncIterator[ProcessableEvent]:
+        connection = await self._get_connection()
+
+        # Consumers get a dedicated channel so they never hold one of the publisher channels
+        async with connection.channel() as channel:
+            await channel.set_qos(prefetch_count=prefetch_count or self._queue_prefetch_count(queue_name))
             queue = await self._declare_queue(channel, queue_name)
+            tracker = RabbitMQDeliveryTracker()
 
             async with queue.iterator() as queue_iterator:
                 async for message in queue_iterator:
-                    try:
-                        message_data: dict = orjson.loads(message.body)
-                        yield ProcessableEvent(
-                            ControllableMessage(
-                                data=message_data,
-                                control=RabbitMQQueueControlInterface(message, message_data, self, queue_name),
-                            )
-                        )
-                    except Exception as e:
-                        self.logger.error(
-                            "Exception while parsing message body",
-                            extra={"message_body": message.body, "error": e},
+                    # Body is decoded by EventParser straight into the event model
+                    tracker.unacked.add(message.delivery_tag)
+                    yield ProcessableEvent(
+                        ControllableMessage(
+                            body=message.body,
+                            control=RabbitMQQueueControlInterface(message, self, queue_name, tracker),
                         )
-                        await message.reject(True)
+                    )
 
     async def publish(self, queue_name: str, message: dict, delay: timedelta = timedelta()) -> None:
-        if delay == timedelta():
-            await self._publish_immediate(queue_name, message)
-        else:
-            await self._publish_delayed(queue_name, message, delay)
+        await self.publish_many(queue_name, [message], delay)
+
+    async def publish_many(self, queue_name: str, messages: list[dict], delay: timedelta = timedelta()) -> None:
+        if messages:
+            await self._publish_bodies(queue_name, [orjson.dumps(message) for message in messages], delay)
+
+    async def close(self) -> None:
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+            self._channel_pool = None
+
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+        self._declared_queues.clear()
+
+    def _queue_prefetch_count(self, queue_name: str) -> int:
+        return self._queue_prefetch_counts.get(queue_name, self._prefetch_count)
+
+    async def _get_connection(self) -> AbstractRobustConnection:
+        async with self._connection_lock:
+            if self._connection is None:
+                self._connection = await aio_pika.connect_robust(url=self._broker_url)
+
+        return self._connection
+
+    async def _create_channel(self) -> AbstractChannel:
+        connection = await self._get_connection()
+        return await connection.channel()
 
     @asynccontextmanager
     async def _channel(self) -> AsyncGenerator[AbstractChannel, None]:
-        connection = await aio_pika.connect_robust(url=self._broker_url)
-        async with connection:
-            yield await connection.channel()
+        if self._channel_pool is None:
+            self._channel_pool = Pool(self._create_channel, max_size=self._channel_pool_size)
+
+        async with self._channel_pool.acquire() as channel:
+            if channel.is_closed:
+                await channel.reopen()
+
+            yield channel
 
     async def _declare_queue(self, channel: AbstractChannel, queue_name: str) -> AbstractQueue:
         return await channel.declare_queue(
@@ -90,36 +193,47 @@ class RabbitMQEventBroker(EventBroker):
             auto_delete=False,
         )
 
-    async def _publish_immediate(self, queue_name: str, message: dict) -> None:
-        async with self._channel() as channel:
-            await self._declare_queue(channel, queue_name)
-
-            await channel.default_exchange.publish(
-                aio_pika.Message(
-                    orjson.dumps(message),
-                    content_type="application/json",
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                ),
-                queue_name,
-                mandatory=True,
-            )
-
-    async def _publish_delayed(self, queue_name: str, message: dict, delay: timedelta = timedelta()) -> None:
+    async def _ensure_queue(self, channel: AbstractChannel, queue_name: str) -> None:
+        if queue_name in self._declared_queues:
+            return
+
+        await self._declare_queue(channel, queue_name)
+        self._declared_queues.add(queue_name)
+
+    async def _ensure_delay_queue(self, channel: AbstractChannel, delay_queue_name: str, orig_queue_name: str) -> None:
+        if delay_queue_name in self._declared_queues:
+            return
+
+        await self._declare_delay_queue(channel, delay_queue_name, orig_queue_name)
+        self._declared_queues.update({delay_queue_name, orig_queue_name})
+
+    async def _publish_bodies(self, queue_name: str, bodies: list[bytes], delay: timedelta = timedelta()) -> None:
         async with self._channel() as channel:
-            delay_queue_name = f"{queue_name}-delay"
-
-            await self._declare_delay_queue(channel, delay_queue_name, queue_name)
-
-            await channel.default_exchange.publish(
-                aio_pika.Message(
-                    orjson.dumps(message),
-                    content_type="application/json",
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                    expiration=delay,
-                ),
-                delay_queue_name,
-                mandatory=True,
-            )
+            if delay == timedelta():
+                routing_key = queue_name
+                await self._ensure_queue(channel, queue_name)
+            else:
+                routing_key = f"{queue_name}-delay"
+                await self._ensure_delay_queue(channel, routing_key, queue_name)
+
+            # Publishing a whole chunk before awaiting confirms pipelines it on the channel,
+            # so the chunk costs one round trip instead of one per message
+            for start in range(0, len(bodies), self._publish_batch_size):
+                await asyncio.gather(
+                    *[
+                        channel.default_exchange.publish(
+                            aio_pika.Message(
+                                body,
+                                content_type="application/json",
+                                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                                expiration=delay or None,
+                            ),
+                            routing_key,
+                            mandatory=True,
+                        )
+                        for body in bodies[start : start + self._publish_batch_size]
+                    ]
+                )
 
     async def _declare_delay_queue(
         self,
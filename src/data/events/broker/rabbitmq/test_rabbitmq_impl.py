@@ -0,0 +1,168 @@
+from datetime import timedelta
+from unittest import mock
+
+import orjson
+import pytest
+from app.settings import Settings
+from data.events.broker.rabbitmq.config import EventBrokerConfig
+from data.events.broker.rabbitmq.rabbitmq_impl import (
+    RabbitMQDeliveryTracker,
+    RabbitMQEventBroker,
+    RabbitMQQueueControlInterface,
+)
+
+
+class FakeChannel:
+    is_closed = False
+
+    def __init__(self):
+        self.declare_queue = mock.AsyncMock()
+        self.declare_exchange = mock.AsyncMock()
+        self.default_exchange = mock.Mock(publish=mock.AsyncMock())
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+    def __await__(self):
+        yield from []
+        return self
+
+
+class FakeConnection:
+    def __init__(self):
+        self.channels: list[FakeChannel] = []
+        self.close = mock.AsyncMock()
+
+    def channel(self) -> FakeChannel:
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+
+@pytest.fixture
+def connection(monkeypatch) -> FakeConnection:
+    connection = FakeConnection()
+    connect = mock.AsyncMock(return_value=connection)
+    monkeypatch.setattr("aio_pika.connect_robust", connect)
+    return connection
+
+
+@pytest.fixture
+def rabbitmq_broker() -> RabbitMQEventBroker:
+    return RabbitMQEventBroker(Settings(broker=EventBrokerConfig(url="amqp://test", channel_pool_size=2)))
+
+
+@pytest.mark.unit
+async def test_publish_reuses_connection_and_channel(connection, rabbitmq_broker):
+    for i in range(5):
+        await rabbitmq_broker.publish("queue", {"id": i})
+
+    assert len(connection.channels) == 1
+
+    channel = connection.channels[0]
+    assert channel.declare_queue.await_count == 1
+    assert channel.default_exchange.publish.await_count == 5
+
+
+@pytest.mark.unit
+async def test_publish_delayed_declares_delay_queue_once(connection, rabbitmq_broker):
+    await rabbitmq_broker.publish("queue", {"id": 1}, timedelta(seconds=5))
+    await rabbitmq_broker.publish("queue", {"id": 2}, timedelta(seconds=5))
+    await rabbitmq_broker.publish("queue", {"id": 3})
+
+    channel = connection.channels[0]
+    assert channel.declare_queue.await_count == 2
+    assert channel.declare_exchange.await_count == 1
+    assert channel.default_exchange.publish.await_count == 3
+
+
+@pytest.mark.unit
+async def test_close(connection, rabbitmq_broker):
+    await rabbitmq_broker.publish("queue", {"id": 1})
+    await rabbitmq_broker.close()
+
+    connection.close.assert_awaited_once()
+    assert connection.channels[0].closed
+
+    await rabbitmq_broker.publish("queue", {"id": 2})
+    assert len(connection.channels) == 2
+    assert connection.channels[1].declare_queue.await_count == 1
+
+
+@pytest.mark.unit
+async def test_publish_many_pipelines_on_one_channel(connection, rabbitmq_broker):
+    rabbitmq_broker._publish_batch_size = 2
+
+    await rabbitmq_broker.publish_many("queue", [{"id": i} for i in range(5)])
+    await rabbitmq_broker.publish_many("queue", [])
+
+    assert len(connection.channels) == 1
+
+    channel = connection.channels[0]
+    assert channel.declare_queue.await_count == 1
+    assert [call.args[1] for call in channel.default_exchange.publish.await_args_list] == ["queue"] * 5
+
+
+@pytest.mark.unit
+async def test_publish_many_delayed(connection, rabbitmq_broker):
+    await rabbitmq_broker.publish_many("queue", [{"id": 1}, {"id": 2}], timedelta(seconds=5))
+
+    channel = connection.channels[0]
+    calls = channel.default_exchange.publish.await_args_list
+    assert [call.args[1] for call in calls] == ["queue-delay", "queue-delay"]
+    assert all(call.args[0].expiration == timedelta(seconds=5) for call in calls)
+
+
+def make_controls(
+    broker: RabbitMQEventBroker, tracker: RabbitMQDeliveryTracker, tags: list[int]
+) -> list[RabbitMQQueueControlInterface]:
+    controls = []
+    for tag in tags:
+        tracker.unacked.add(tag)
+        message = mock.Mock(delivery_tag=tag, body=orjson.dumps({"id": tag}), ack=mock.AsyncMock())
+        controls.append(RabbitMQQueueControlInterface(message, broker, "queue", tracker))
+
+    return controls
+
+
+@pytest.mark.unit
+async def test_ack_many_uses_multiple_ack(rabbitmq_broker):
+    tracker = RabbitMQDeliveryTracker()
+    controls = make_controls(rabbitmq_broker, tracker, [1, 2, 3])
+
+    await RabbitMQQueueControlInterface.ack_many(controls)
+
+    assert [control._message.ack.await_args_list for control in controls] == [[], [], [mock.call(multiple=True)]]
+    assert tracker.unacked == set()
+
+    # Already acked controls are skipped
+    await RabbitMQQueueControlInterface.ack_many(controls)
+    assert controls[2]._message.ack.await_count == 1
+
+
+@pytest.mark.unit
+async def test_ack_many_skips_messages_outside_of_batch(rabbitmq_broker):
+    tracker = RabbitMQDeliveryTracker()
+    controls = make_controls(rabbitmq_broker, tracker, [1, 2, 3, 4])
+
+    await RabbitMQQueueControlInterface.ack_many([controls[0], controls[1], controls[3]])
+
+    assert controls[1]._message.ack.await_args_list == [mock.call(multiple=True)]
+    assert controls[2]._message.ack.await_count == 0
+    assert controls[3]._message.ack.await_args_list == [mock.call()]
+    assert tracker.unacked == {3}
+
+
+@pytest.mark.unit
+async def test_delay_many_republishes_batch(connection, rabbitmq_broker):
+    tracker = RabbitMQDeliveryTracker()
+    controls = make_controls(rabbitmq_broker, tracker, [1, 2])
+
+    await RabbitMQQueueControlInterface.delay_many(controls, timedelta(seconds=5))
+
+    channel = connection.channels[0]
+    calls = channel.default_exchange.publish.await_args_list
+    assert [call.args[1] for call in calls] == ["queue-delay", "queue-delay"]
+    assert controls[1]._message.ack.await_args_list == [mock.call(multiple=True)]
+    assert tracker.unacked == set()
@@ -0,0 +1,70 @@
+import enum
+import time
+from typing import Callable
+
+from data.network.exception import CircuitOpenError
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
+        self._state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._trial_calls = 0
+
+        return self._state
+
+    def acquire(self) -> None:
+        state = self.state
+
+        if state == CircuitState.OPEN:
+            raise CircuitOpenError(payload={"host": self.host})
+
+        if state == CircuitState.HALF_OPEN:
+            if self._trial_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(payload={"host": self.host})
+            self._trial_calls += 1
+
+    def release(self, success: bool | None) -> None:
+        """Records outcome of an acquired call, None means the call was interrupted without outcome"""
+        if self._state == CircuitState.HALF_OPEN:
+            self._trial_calls -= 1
+
+        if success is None:
+            return
+
+        if success:
+            self._state = CircuitState.CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self._state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = CircuitState.OPEN
+            self._opened_at = self._clock()
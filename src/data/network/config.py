@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+
+class HttpClientConfig(BaseModel):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    # Requires the h2 package (httpx[http2])
+    http2: bool = False
+    # Limit of concurrent requests to one host, None means only max_connections applies
+    max_connections_per_host: int | None = None
+    # Concurrent GETs of the same URL share one upstream request and its response
+    coalesce_get: bool = False
+
+    retry_attempts: int = 3
+    retry_wait_multiplier: float = 0.5
+    # Share of calls which can be retried, see RetryBudget
+    retry_budget_ratio: float = 0.2
+    retry_budget_max_tokens: float = 10.0
+
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
@@ -0,0 +1,5 @@
+from domain.errors.app_exception import AppException
+
+
+class CircuitOpenError(AppException):
+    pass
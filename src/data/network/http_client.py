@@ -16,3 +16,6 @@ class HttpClient(abc.ABC):
         timeout: int = 10,
     ) -> httpx.Response:
         raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
@@ -1,11 +1,17 @@
-from typing import Mapping
+import asyncio
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Mapping
 
 import httpx
 import tenacity
+from app.settings import Settings
+from data.network.circuit_breaker import CircuitBreaker, CircuitState
 from data.network.http_client import HttpClient
+from data.network.retry_budget import RetryBudget
 
 
-def is_retriable(error: Exception) -> bool:
+def is_retriable(error: BaseException) -> bool:
     return (
         isinstance(error, httpx.TransportError)
         or isinstance(error, httpx.HTTPStatusError)
@@ -17,26 +23,133 @@ def is_forbidden(error: Exception) -> bool:
     return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 403
 
 
+@dataclass
+class HostPoolStats:
+    connections: int = 0
+    idle: int = 0
+
+
 class HttpClientImpl(HttpClient):
-    @tenacity.retry(
-        stop=tenacity.stop_after_attempt(3),
-        wait=tenacity.wait_exponential(multiplier=0.5),
-        retry=tenacity.retry_if_result(is_retriable),
-        reraise=True,
-    )
+    def __init__(self, settings: Settings):
+        self._config = config = settings.http_client
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            http2=config.http2,
+        )
+        # One client per process, so connections (and DNS/TLS setup) are reused between calls
+        self._client = httpx.AsyncClient(transport=self._transport)
+
+        self.retry_budget = RetryBudget(ratio=config.retry_budget_ratio, max_tokens=config.retry_budget_max_tokens)
+        self.circuit_breakers: dict[str, CircuitBreaker] = {}
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._in_flight_gets: dict[str, asyncio.Task[httpx.Response]] = {}
+
     async def get(self, url: str, timeout: int = 10) -> httpx.Response:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            return r
+        if not self._config.coalesce_get:
+            return await self._request("GET", url, raise_for_status=True, timeout=timeout)
+
+        # Callers joining an in-flight GET get its response (or error), the timeout of the first caller applies
+        task = self._in_flight_gets.get(url)
+        if task is None:
+            task = asyncio.create_task(self._request("GET", url, raise_for_status=True, timeout=timeout))
+            self._in_flight_gets[url] = task
+            task.add_done_callback(lambda _: self._in_flight_gets.pop(url, None))
+
+        # Cancelled caller must not cancel the request for the others
+        return await asyncio.shield(task)
 
-    @tenacity.retry(
-        stop=tenacity.stop_after_attempt(3),
-        wait=tenacity.wait_exponential(multiplier=0.5),
-        retry=tenacity.retry_if_result(is_retriable),
-        reraise=True,
-    )
     async def post(self, url: str, json: Mapping, headers: Mapping, timeout: int = 10) -> httpx.Response:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.post(url, json=json, headers=headers)
-            return r
+        return await self._request("POST", url, raise_for_status=False, json=json, headers=headers, timeout=timeout)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    def circuit_states(self) -> dict[str, CircuitState]:
+        return {host: breaker.state for host, breaker in self.circuit_breakers.items()}
+
+    def pool_stats(self) -> dict[str, HostPoolStats]:
+        # httpx has no public API for its pool, the stats are read from the underlying httpcore pool
+        stats: dict[str, HostPoolStats] = {}
+        for connection in self._transport._pool.connections:
+            origin = connection._origin  # type: ignore
+            host = f"{origin.scheme.decode()}://{origin.host.decode()}:{origin.port}"
+            host_stats = stats.setdefault(host, HostPoolStats())
+            host_stats.connections += 1
+            if connection.is_idle():
+                host_stats.idle += 1
+
+        return stats
+
+    async def _request(self, method: str, url: str, raise_for_status: bool, **kwargs: Any) -> httpx.Response:
+        breaker = self._circuit_breaker(url)
+        self.retry_budget.deposit()
+
+        # Open circuit (CircuitOpenError) is not retriable, so a call to a failing host fails fast
+        retrying = tenacity.AsyncRetrying(
+            stop=tenacity.stop_after_attempt(self._config.retry_attempts) | tenacity.stop_any(self.retry_budget.stop),
+            wait=tenacity.wait_exponential(multiplier=self._config.retry_wait_multiplier),
+            retry=tenacity.retry_if_exception(is_retriable),
+            reraise=True,
+        )
+
+        async for attempt in retrying:
+            with attempt:
+                return await self._send(breaker, method, url, raise_for_status, **kwargs)
+
+        raise AssertionError("unreachable")
+
+    async def _send(
+        self,
+        breaker: CircuitBreaker,
+        method: str,
+        url: str,
+        raise_for_status: bool,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        breaker.acquire()
+
+        try:
+            async with self._host_semaphore(breaker.host):
+                r = await self._client.request(method, url, **kwargs)
+        except Exception as e:
+            breaker.release(not is_retriable(e))
+            raise
+        except BaseException:
+            breaker.release(None)
+            raise
+
+        try:
+            r.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            breaker.release(not is_retriable(e))
+            if raise_for_status:
+                raise
+        else:
+            breaker.release(True)
+
+        return r
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore | nullcontext:
+        if self._config.max_connections_per_host is None:
+            return nullcontext()
+
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self._config.max_connections_per_host)
+
+        return self._host_semaphores[host]
+
+    def _circuit_breaker(self, url: str) -> CircuitBreaker:
+        host = httpx.URL(url).host
+
+        if host not in self.circuit_breakers:
+            self.circuit_breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=self._config.circuit_failure_threshold,
+                reset_timeout=self._config.circuit_reset_timeout,
+            )
+
+        return self.circuit_breakers[host]
@@ -0,0 +1,27 @@
+import tenacity
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all calls: every call deposits ratio of a token, every retry withdraws a whole one,
+    so retries can't add more than ratio of extra load (plus max_tokens burst) on a failing upstream
+    """
+
+    def __init__(self, *, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+    def stop(self, retry_state: tenacity.RetryCallState) -> bool:
+        """Tenacity stop condition which stops retrying once the budget is exhausted"""
+        return not self.try_withdraw()
@@ -0,0 +1,71 @@
+import pytest
+from data.network.circuit_breaker import CircuitBreaker, CircuitState
+from data.network.exception import CircuitOpenError
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+def test_circuit_opens_after_failures():
+    clock = Clock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.acquire()
+    breaker.release(False)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.acquire()
+    breaker.release(False)
+    assert breaker.state == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+@pytest.mark.unit
+def test_success_resets_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+
+    breaker.acquire()
+    breaker.release(False)
+    breaker.acquire()
+    breaker.release(True)
+    breaker.acquire()
+    breaker.release(False)
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.unit
+def test_half_open_allows_one_trial_call():
+    clock = Clock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.acquire()
+    breaker.release(False)
+
+    clock.now = 10
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    # Interrupted trial frees the slot without changing the state
+    breaker.release(None)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    breaker.acquire()
+    breaker.release(False)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now = 20
+    breaker.acquire()
+    breaker.release(True)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.failures == 0
@@ -0,0 +1,187 @@
+import asyncio
+from unittest import mock
+
+import httpx
+import pytest
+from app.settings import Settings
+from data.network.circuit_breaker import CircuitState
+from data.network.config import HttpClientConfig
+from data.network.exception import CircuitOpenError
+from data.network.http_client_impl import HostPoolStats, HttpClientImpl
+
+
+@pytest.fixture
+async def http_client():
+    client = HttpClientImpl(
+        Settings(
+            http_client=HttpClientConfig(
+                max_connections=5,
+                retry_wait_multiplier=0,
+                retry_budget_max_tokens=2,
+                circuit_failure_threshold=3,
+            )
+        )
+    )
+    yield client
+    await client.close()
+
+
+@pytest.mark.unit
+async def test_requests_share_client(http_client):
+    requests: list[httpx.Request] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    assert (await http_client.get("http://test/a")).json() == {"path": "/a"}
+    assert (await http_client.post("http://test/b", json={}, headers={"X-Test": "1"}, timeout=1)).json() == {
+        "path": "/b"
+    }
+
+    assert [request.method for request in requests] == ["GET", "POST"]
+    assert requests[1].headers["X-Test"] == "1"
+    assert requests[1].extensions["timeout"]["read"] == 1
+
+
+@pytest.mark.unit
+async def test_get_raises_for_status(http_client):
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await http_client.get("http://test/a")
+
+
+@pytest.mark.unit
+async def test_pool_stats(http_client):
+    def connection(host: bytes, idle: bool):
+        origin = mock.Mock(scheme=b"https", host=host, port=443)
+        return mock.Mock(_origin=origin, is_idle=mock.Mock(return_value=idle))
+
+    http_client._transport._pool = mock.Mock(
+        aclose=mock.AsyncMock(),
+        connections=[connection(b"a.test", True), connection(b"a.test", False), connection(b"b.test", True)]
+    )
+
+    assert http_client.pool_stats() == {
+        "https://a.test:443": HostPoolStats(connections=2, idle=1),
+        "https://b.test:443": HostPoolStats(connections=1, idle=1),
+    }
+
+
+def respond(http_client: HttpClientImpl, *statuses: int) -> list[httpx.Request]:
+    requests: list[httpx.Request] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(statuses[min(len(requests), len(statuses)) - 1])
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    return requests
+
+
+@pytest.mark.unit
+async def test_get_retries_retriable_errors(http_client):
+    requests = respond(http_client, 503, 200)
+
+    assert (await http_client.get("http://test/a")).status_code == 200
+    assert len(requests) == 2
+
+
+@pytest.mark.unit
+async def test_get_does_not_retry_client_errors(http_client):
+    requests = respond(http_client, 400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await http_client.get("http://test/a")
+
+    assert len(requests) == 1
+    assert http_client.circuit_states() == {"test": CircuitState.CLOSED}
+
+
+@pytest.mark.unit
+async def test_retry_budget_limits_retries(http_client):
+    requests = respond(http_client, 503)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await http_client.get("http://a.test/")
+    assert len(requests) == 3
+
+    # Budget allows only two retries (plus a share of new calls) in total
+    with pytest.raises(httpx.HTTPStatusError):
+        await http_client.get("http://b.test/")
+    assert len(requests) == 4
+
+
+@pytest.mark.unit
+async def test_open_circuit_fails_fast(http_client):
+    requests = respond(http_client, 503)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await http_client.get("http://test/a")
+    assert http_client.circuit_states() == {"test": CircuitState.OPEN}
+
+    with pytest.raises(CircuitOpenError):
+        await http_client.get("http://test/a")
+    assert len(requests) == 3
+
+
+@pytest.mark.unit
+async def test_coalesced_gets_hit_upstream_once(http_client):
+    http_client._config.coalesce_get = True
+    requests: list[httpx.Request] = []
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    responses = await asyncio.gather(*[http_client.get("http://test/a") for _ in range(50)])
+    other = await http_client.get("http://test/b")
+
+    assert len(requests) == 2
+    assert all(response.json() == {"path": "/a"} for response in responses)
+    assert other.json() == {"path": "/b"}
+    assert http_client._in_flight_gets == {}
+
+
+@pytest.mark.unit
+async def test_coalesced_get_survives_cancelled_caller(http_client):
+    http_client._config.coalesce_get = True
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(200)
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    first = asyncio.create_task(http_client.get("http://test/a"))
+    second = asyncio.create_task(http_client.get("http://test/a"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert (await second).status_code == 200
+
+
+@pytest.mark.unit
+async def test_host_concurrency_limit(http_client):
+    http_client._config.max_connections_per_host = 2
+    in_flight = max_in_flight = 0
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200)
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    await asyncio.gather(*[http_client.get(f"http://test/{i}") for i in range(10)])
+
+    assert max_in_flight == 2
@@ -1,17 +1,99 @@
-from data.storage.postgres.exception import TransactionNotExists
-from data.storage.postgres.transaction import current_transaction
+import hashlib
+from contextlib import AsyncExitStack
+from datetime import timedelta
+
+import asyncpg
+from data.storage.postgres.exception import LockNotAcquired
+
+
+def advisory_lock_key(name: str) -> int:
+    """Signed 64-bit key, unlike hash() it's the same in every process"""
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+async def acquire_advisory_lock(
+    connection: asyncpg.Connection, key: int, timeout: timedelta | None = None, *, xact: bool = False
+) -> bool:
+    """
+    Waits for the lock up to timeout, forever if it's None, zero timeout only tries to take it.
+    Transaction-level (xact) lock is released at the end of the transaction, session-level one by unlock.
+    """
+    scope = "_xact" if xact else ""
+
+    if timeout is None:
+        await connection.execute(f"SELECT pg_advisory{scope}_lock($1)", key)
+        return True
+
+    if timeout <= timedelta(0):
+        return await connection.fetchval(f"SELECT pg_try_advisory{scope}_lock($1)", key)
+
+    # lock_timeout applies to advisory locks as well
+    milliseconds = f"{int(timeout / timedelta(milliseconds=1))}ms"
+    previous = await connection.fetchval("SELECT current_setting('lock_timeout')")
+    try:
+        if xact:
+            # Failed lock aborts the transaction, so it's taken in a savepoint, rollback of which reverts lock_timeout
+            async with connection.transaction():
+                await connection.execute("SELECT set_config('lock_timeout', $1, true)", milliseconds)
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", key)
+                await connection.execute("SELECT set_config('lock_timeout', $1, true)", previous)
+        else:
+            await connection.execute("SELECT set_config('lock_timeout', $1, false)", milliseconds)
+            try:
+                await connection.execute("SELECT pg_advisory_lock($1)", key)
+            finally:
+                await connection.execute("SELECT set_config('lock_timeout', $1, false)", previous)
+    except asyncpg.LockNotAvailableError:
+        return False
+
+    return True
 
 
 class AdvisoryLock:
-    def __init__(self, name: str):
-        self.name = hash(name)
-        self.transaction = current_transaction.get()
+    """
+    Session-level advisory lock held on its own pool connection, so no transaction stays open while it's held.
+    Raises LockNotAcquired if the lock isn't taken within timeout.
+    """
 
-    async def __aenter__(self):
-        if not self.transaction:
-            raise TransactionNotExists
+    def __init__(self, pool: asyncpg.pool.Pool, name: str, timeout: timedelta | None = None):
+        self.pool = pool
+        self.name = name
+        self.key = advisory_lock_key(name)
+        self.timeout = timeout
+        self._stack: AsyncExitStack | None = None
+        self._connection: asyncpg.Connection | None = None
+
+    async def acquire(self) -> bool:
+        assert self._stack is None, "Lock is already acquired"
+
+        stack = AsyncExitStack()
+        connection = await stack.enter_async_context(self.pool.acquire())
+        try:
+            acquired = await acquire_advisory_lock(connection, self.key, self.timeout)
+        except BaseException:
+            await stack.aclose()
+            raise
+
+        if not acquired:
+            await stack.aclose()
+            return False
 
-        await self.transaction.execute("SELECT pg_advisory_lock($1)", self.name)
+        self._stack, self._connection = stack, connection
+        return True
+
+    async def release(self) -> None:
+        assert self._stack is not None and self._connection is not None, "Lock is not acquired"
+
+        try:
+            await self._connection.execute("SELECT pg_advisory_unlock($1)", self.key)
+        finally:
+            stack, self._stack, self._connection = self._stack, None, None
+            await stack.aclose()
+
+    async def __aenter__(self):
+        if not await self.acquire():
+            raise LockNotAcquired
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.transaction.execute("SELECT pg_advisory_unlock($1)", self.name)
+        await self.release()
@@ -1,32 +1,63 @@
 import asyncio
-from contextlib import asynccontextmanager
+import socket
+import time
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
 from datetime import timedelta
-from typing import Any, AsyncIterator, Iterable, List, cast
-from uuid import UUID
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, cast
+from uuid import UUID, uuid4
 
 import asyncpg
 import orjson
-from data.storage.postgres.advisory_lock import AdvisoryLock
+from data.storage.postgres.advisory_lock import AdvisoryLock, acquire_advisory_lock, advisory_lock_key
+from data.storage.postgres.compiled_query import CompiledQuery, prepared_statements
 from data.storage.postgres.config import PostgresConfig
-from data.storage.postgres.exception import TransactionIsolationMismatch, TransactionNotExists
-from data.storage.postgres.transaction import current_transaction
+from data.storage.postgres.escape import quote_identifier
+from data.storage.postgres.exception import (
+    TransactionIsolationMismatch,
+    TransactionModeMismatch,
+    TransactionNotExists,
+)
+from data.storage.postgres.pool import MeteredPool, PoolStats
+from data.storage.postgres.transaction import (
+    current_settings,
+    current_transaction,
+    set_local_settings,
+    timeout_settings,
+)
 from data.storage.postgres.utils import json_encoder
 from data.storage.postgresql_database import PostgresDatabase
 
+# Errors meaning that a replica is unavailable rather than that a query is wrong or slow.
+# TimeoutError is an OSError, so OSError as a whole would make a slow query run again on the primary
+REPLICA_ERRORS = (
+    ConnectionError,
+    socket.gaierror,
+    asyncpg.PostgresConnectionError,
+    asyncpg.ConnectionDoesNotExistError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,
+)
+# No query has run yet while connecting, so a timeout means an unreachable replica too
+REPLICA_CONNECT_ERRORS = (*REPLICA_ERRORS, TimeoutError)
+
 
 class TransactionContext:
-    __slots__ = ["__pool", "__connection_ctx", "__transaction", "isolation"]
+    __slots__ = ["__pool", "__connection_ctx", "__transaction", "isolation", "read_only", "deferrable"]
 
-    def __init__(self, pool: asyncpg.pool.Pool, isolation: str):
+    def __init__(self, pool: asyncpg.pool.Pool, isolation: str, read_only: bool = False, deferrable: bool = False):
         self.__pool = pool
         self.__connection_ctx = None
         self.__transaction = None
         self.isolation = isolation
+        self.read_only = read_only
+        self.deferrable = deferrable
 
     async def __aenter__(self):
         self.__connection_ctx = self.__pool.acquire()
         connection = cast(asyncpg.connection.Connection, await self.__connection_ctx.__aenter__())
-        self.__transaction = connection.transaction(isolation=self.isolation)
+        self.__transaction = connection.transaction(
+            isolation=self.isolation, readonly=self.read_only, deferrable=self.deferrable
+        )
         try:
             await self.__transaction.__aenter__()
         except Exception:
@@ -46,10 +77,26 @@ class TransactionContext:
 
 
 class AsyncpgPostgresDatabase(PostgresDatabase):
-    __slots__ = ("__pool",)
+    __slots__ = (
+        "__pool",
+        "__settings",
+        "__replicas",
+        "__replicas_lock",
+        "__replicas_down_until",
+        "__next_replica",
+        "__replica_retry_interval",
+    )
 
     def __init__(self):
         self.__pool = None
+        self.__settings: PostgresConfig | None = None
+        # Pool of a replica which was unreachable is None until it's created on a later read
+        self.__replicas: list[MeteredPool | None] = []
+        self.__replicas_lock = asyncio.Lock()
+        # Monotonic time until which a replica is skipped, by replica index
+        self.__replicas_down_until: list[float] = []
+        self.__next_replica = 0
+        self.__replica_retry_interval = 0.0
 
     @property
     def pool(self) -> asyncpg.pool.Pool:
@@ -57,12 +104,15 @@ class AsyncpgPostgresDatabase(PostgresDatabase):
         return self.__pool
 
     @staticmethod
-    def _connection_init():
+    def _connection_init(settings: PostgresConfig):
         async def wrapper(connection: asyncpg.Connection):
             await connection.set_type_codec("json", schema="pg_catalog", encoder=json_encoder, decoder=orjson.loads)
             await connection.set_type_codec("jsonb", schema="pg_catalog", encoder=json_encoder, decoder=orjson.loads)
             await connection.set_type_codec("uuid", schema="pg_catalog", encoder=str, decoder=UUID)
 
+            if settings.statement_cache_size:
+                await prepared_statements.prepare(connection)
+
         return wrapper
 
     def _connection_setup(self):
@@ -73,57 +123,199 @@ class AsyncpgPostgresDatabase(PostgresDatabase):
 
     async def init(self, settings: PostgresConfig):
         assert settings.dsn
-        self.__pool = await asyncpg.create_pool(
-            dsn=settings.dsn,
-            init=self._connection_init(),
+        self.__settings = settings
+        self.__pool = await self._create_pool(settings.dsn, settings)
+        self.__replicas = [None] * len(settings.replica_dsns)
+        self.__replicas_down_until = [0.0] * len(settings.replica_dsns)
+        self.__replica_retry_interval = settings.replica_retry_interval
+
+        # Unreachable replica doesn't stop the startup, reads go to the primary meanwhile
+        for index in range(len(self.__replicas)):
+            try:
+                await self._replica_pool(index)
+            except REPLICA_CONNECT_ERRORS:
+                self._mark_replica_down(index)
+
+    async def _create_pool(self, dsn: str, settings: PostgresConfig) -> MeteredPool:
+        # Same as asyncpg.create_pool, which has no way to use a Pool subclass
+        return await MeteredPool(
+            dsn=dsn,
+            init=self._connection_init(settings),
             setup=self._connection_setup(),
-            min_size=1,
-            max_size=10,
+            min_size=settings.min_size,
+            max_size=settings.max_size,
+            max_queries=settings.max_queries,
+            max_inactive_connection_lifetime=settings.max_inactive_connection_lifetime,
+            command_timeout=settings.command_timeout,
+            statement_cache_size=settings.statement_cache_size,
+            max_cached_statement_lifetime=settings.max_cached_statement_lifetime,
+            loop=None,
+            connection_class=asyncpg.Connection,
+            record_class=asyncpg.Record,
         )
 
+    def pool_stats(self) -> PoolStats:
+        return self.pool.stats()
+
+    def replica_pool_stats(self) -> list[PoolStats | None]:
+        return [replica.stats() if replica else None for replica in self.__replicas]
+
     async def close(self):
         await self.pool.close()
         self.__pool = None
 
-    async def fetch(self, query: str, *args, timeout: float | None = None) -> List[asyncpg.Record]:
-        method = getattr(current_transaction.get(), "fetch", self.pool.fetch)
-        return await method(query, *args, timeout=timeout)
+        for replica in self.__replicas:
+            if replica:
+                await replica.close()
+        self.__replicas = []
+        self.__replicas_down_until = []
+
+    async def fetch(
+        self, query: str | CompiledQuery, *args, timeout: float | None = None, use_primary: bool = False
+    ) -> List[asyncpg.Record]:
+        return await self._read("fetch", query, *args, timeout=timeout, use_primary=use_primary)
+
+    async def fetchrow(
+        self, query: str | CompiledQuery, *args, timeout: float | None = None, use_primary: bool = False
+    ) -> asyncpg.Record:
+        return await self._read("fetchrow", query, *args, timeout=timeout, use_primary=use_primary)
+
+    async def fetchval(
+        self, query: str | CompiledQuery, *args, timeout: float | None = None, use_primary: bool = False
+    ) -> Any:
+        return await self._read("fetchval", query, *args, timeout=timeout, use_primary=use_primary)
+
+    async def _read(
+        self, method_name: str, query: str | CompiledQuery, *args, timeout: float | None, use_primary: bool
+    ):
+        # Reads of a transaction must see its writes, so they stay on its connection
+        if current_transaction.get():
+            return await self._run(self.pool, method_name, query, *args, timeout=timeout)
 
-    async def fetchrow(self, query: str, *args, timeout: float | None = None) -> asyncpg.Record:
-        method = getattr(current_transaction.get(), "fetchrow", self.pool.fetchrow)
-        return await method(query, *args, timeout=timeout)
+        replica = None if use_primary else self._pick_replica()
+        if replica is not None:
+            try:
+                pool = await self._replica_pool(replica)
+            except REPLICA_CONNECT_ERRORS:
+                self._mark_replica_down(replica)
+            else:
+                try:
+                    return await self._run(pool, method_name, query, *args, timeout=timeout)
+                except REPLICA_ERRORS:
+                    self._mark_replica_down(replica)
+
+        return await self._run(self.pool, method_name, query, *args, timeout=timeout)
+
+    def _pick_replica(self) -> int | None:
+        """Index of the least busy available replica, ties are resolved round-robin"""
+        if not self.__replicas:
+            return None
+
+        now = time.monotonic()
+        picked, picked_load = None, 0
+        for offset in range(len(self.__replicas)):
+            index = (self.__next_replica + offset) % len(self.__replicas)
+            if self.__replicas_down_until[index] > now:
+                continue
+
+            replica = self.__replicas[index]
+            load = replica.get_size() - replica.get_idle_size() + replica.waiting if replica else 0
+            if picked is None or load < picked_load:
+                picked, picked_load = index, load
+
+        self.__next_replica = (self.__next_replica + 1) % len(self.__replicas)
+        return picked
+
+    def _mark_replica_down(self, index: int) -> None:
+        self.__replicas_down_until[index] = time.monotonic() + self.__replica_retry_interval
+
+    async def _replica_pool(self, index: int) -> MeteredPool:
+        if pool := self.__replicas[index]:
+            return pool
+
+        # Concurrent reads must share one pool
+        async with self.__replicas_lock:
+            if not self.__replicas[index]:
+                settings = cast(PostgresConfig, self.__settings)
+                self.__replicas[index] = await self._create_pool(settings.replica_dsns[index], settings)
+
+        return cast(MeteredPool, self.__replicas[index])
+
+    async def execute(self, query: str | CompiledQuery, *args, timeout: float | None = None) -> str:
+        return await self._run(self.pool, "execute", query, *args, timeout=timeout)
+
+    async def _run(
+        self, pool: MeteredPool, method_name: str, query: str | CompiledQuery, *args, timeout: float | None
+    ) -> Any:
+        """Runs query in the current transaction or on pool, compiled one through its prepared statement"""
+        transaction = current_transaction.get()
 
-    async def fetchval(self, query: str, *args, timeout: float | None = None) -> Any:
-        method = getattr(current_transaction.get(), "fetchval", self.pool.fetchval)
-        return await method(query, *args, timeout=timeout)
+        # Without the statement cache, e.g. behind pgbouncer, statements mustn't outlive a transaction
+        settings = cast(PostgresConfig, self.__settings)
+        if not isinstance(query, CompiledQuery) or not settings.statement_cache_size:
+            return await getattr(transaction or pool, method_name)(str(query), *args, timeout=timeout)
 
-    async def execute(self, query: str, *args, timeout: float | None = None) -> str:
-        method = getattr(current_transaction.get(), "execute", self.pool.execute)
-        return await method(query, *args, timeout=timeout)
+        async with AsyncExitStack() as stack:
+            connection = transaction or await stack.enter_async_context(pool.acquire())
+            statement = await prepared_statements.get(connection, query)
+
+            # PreparedStatement has no execute, its status is kept after a fetch
+            if method_name == "execute":
+                await statement.fetch(*args, timeout=timeout)
+                return statement.get_statusmsg()
+
+            return await getattr(statement, method_name)(*args, timeout=timeout)
 
     async def executemany(self, query: str, *args, timeout: float | None = None):
         method = getattr(current_transaction.get(), "executemany", self.pool.executemany)
         return await method(query, *args, timeout=timeout)
 
-    async def cursor(self, query: str, *args, step: int = 500) -> AsyncIterator[asyncpg.Record]:
-        async with self.pool.acquire() as connection:
-            async with connection.transaction():
-                cursor = await connection.cursor(query, *args)
+    async def cursor(
+        self, query: str, *args, step: int = 500, prefetch: bool | None = None
+    ) -> AsyncIterator[asyncpg.Record]:
+        async with aclosing(self.cursor_pages(query, *args, step=step, prefetch=prefetch)) as pages:
+            async for rows in pages:
+                for row in rows:
+                    yield row
+
+    async def cursor_pages(
+        self, query: str, *args, step: int = 500, prefetch: bool | None = None
+    ) -> AsyncIterator[list[asyncpg.Record]]:
+        in_transaction = current_transaction.get() is not None
+        # Connection can't run other queries while a page is prefetched, so by default the current transaction
+        # stays usable between pages
+        if prefetch is None:
+            prefetch = not in_transaction
+
+        async with self._transaction_connection() as connection:
+            cursor = await connection.cursor(query, *args)
+
+            if not prefetch:
                 while rows := await cursor.fetch(step):
-                    for row in rows:
-                        yield row
+                    yield rows
+                return
+
+            # Next page is fetched while the caller processes the current one
+            next_page = asyncio.ensure_future(cursor.fetch(step))
+            try:
+                while rows := await next_page:
+                    next_page = asyncio.ensure_future(cursor.fetch(step))
+                    yield rows
+            finally:
+                # Cancelled fetch could leave the connection in the middle of the protocol
+                await asyncio.gather(next_page, return_exceptions=True)
 
     async def copy_records_to_table(
         self,
         table_name: str,
         *,
-        records: Iterable[tuple],
+        records: Iterable[tuple] | AsyncIterable[tuple],
         columns: list[str] | None = None,
         schema_name: str | None = None,
-        timeout: float | int | None = None,
-    ):
-        async def _copy(conn, table_name, records, columns, schema_name, timeout):
-            await conn.copy_records_to_table(
+        timeout: float | None = None,
+    ) -> int:
+        async with self._transaction_connection() as connection:
+            status = await connection.copy_records_to_table(
                 table_name,
                 records=records,
                 columns=columns,
@@ -131,19 +323,91 @@ class AsyncpgPostgresDatabase(PostgresDatabase):
                 timeout=timeout,
             )
 
+        return _affected_rows(status)
+
+    async def upsert_records(
+        self,
+        table_name: str,
+        *,
+        records: Iterable[tuple] | AsyncIterable[tuple],
+        columns: list[str],
+        conflict_columns: list[str],
+        update_columns: list[str] | None = None,
+        schema_name: str | None = None,
+        timeout: float | None = None,
+    ) -> int:
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in conflict_columns]
+
+        table = quote_identifier(table_name)
+        if schema_name:
+            table = f"{quote_identifier(schema_name)}.{table}"
+        # Unique name, so upserts can be repeated in one transaction
+        temp_table = f"upsert_{uuid4().hex}"
+        column_list = ", ".join(quote_identifier(column) for column in columns)
+        conflict_list = ", ".join(quote_identifier(column) for column in conflict_columns)
+
+        if update_columns:
+            updates = ", ".join(
+                f"{quote_identifier(column)} = EXCLUDED.{quote_identifier(column)}" for column in update_columns
+            )
+            on_conflict = f"DO UPDATE SET {updates}"
+        else:
+            on_conflict = "DO NOTHING"
+
+        async with self._transaction_connection() as connection:
+            # Temp table has the columns only, so constraints and defaults of the table apply once on INSERT
+            await connection.execute(
+                f"CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA",
+                timeout=timeout,
+            )
+            await connection.copy_records_to_table(temp_table, records=records, columns=columns, timeout=timeout)
+            status = await connection.execute(
+                f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {temp_table} "
+                f"ON CONFLICT ({conflict_list}) {on_conflict}",
+                timeout=timeout,
+            )
+            await connection.execute(f"DROP TABLE {temp_table}", timeout=timeout)
+
+        return _affected_rows(status)
+
+    @asynccontextmanager
+    async def _transaction_connection(self) -> AsyncIterator[asyncpg.Connection]:
+        if transaction := current_transaction.get():
+            yield transaction
+            return
+
         async with self.pool.acquire() as connection:
             async with connection.transaction():
-                await _copy(connection, table_name, records, columns, schema_name, timeout)
+                yield connection
 
     @asynccontextmanager
-    async def transaction(self, isolation: str = "read_committed"):
+    async def transaction(
+        self,
+        isolation: str = "read_committed",
+        read_only: bool = False,
+        deferrable: bool = False,
+        *,
+        use_replica: bool = False,
+        statement_timeout: timedelta | None = None,
+        lock_timeout: timedelta | None = None,
+        idle_in_transaction_session_timeout: timedelta | None = None,
+    ):
+        assert read_only or not use_replica, "Only a read only transaction can run on a replica"
         transaction = current_transaction.get()
+        settings = timeout_settings(statement_timeout, lock_timeout, idle_in_transaction_session_timeout)
 
-        if transaction and transaction._con._top_xact._isolation != isolation:
-            raise TransactionIsolationMismatch
+        if transaction:
+            top_transaction = transaction._con._top_xact
+            if top_transaction._isolation != isolation:
+                raise TransactionIsolationMismatch
+            # Savepoint can't change the access mode or get a snapshot of its own
+            if top_transaction._readonly != read_only or (deferrable and not top_transaction._deferrable):
+                raise TransactionModeMismatch
 
         if not transaction:
-            async with TransactionContext(pool=self.pool, isolation=isolation) as conn:
+            async with self._transaction_context(isolation, read_only, deferrable, use_replica) as conn:
+                await set_local_settings(conn, settings)
                 current_transaction.set(conn)
 
                 try:
@@ -151,23 +415,63 @@ class AsyncpgPostgresDatabase(PostgresDatabase):
                 finally:
                     current_transaction.set(None)
         else:
-            yield
+            # Nested transaction is a savepoint
+            async with transaction.transaction():
+                previous = await current_settings(transaction, list(settings))
+                await set_local_settings(transaction, settings)
+                yield
+                # Released savepoint keeps local settings, rolled back one reverts them itself
+                await set_local_settings(transaction, previous)
 
     @asynccontextmanager
-    async def lock(self, name: str):
-        async with AdvisoryLock(self.pool, name):
+    async def _transaction_context(
+        self, isolation: str, read_only: bool, deferrable: bool = False, use_replica: bool = False
+    ):
+        async with AsyncExitStack() as stack:
+            conn = None
+
+            # Hot standby doesn't support serializable transactions
+            replica = self._pick_replica() if use_replica and isolation != "serializable" else None
+            if replica is not None:
+                try:
+                    pool = await self._replica_pool(replica)
+                    context = TransactionContext(pool=pool, isolation=isolation, read_only=True)
+                    conn = await stack.enter_async_context(context)
+                except REPLICA_CONNECT_ERRORS:
+                    self._mark_replica_down(replica)
+
+            if conn is None:
+                context = TransactionContext(
+                    pool=self.pool, isolation=isolation, read_only=read_only, deferrable=deferrable
+                )
+                conn = await stack.enter_async_context(context)
+
+            yield conn
+
+    @asynccontextmanager
+    async def lock(self, name: str, timeout: timedelta | None = None):
+        async with AdvisoryLock(self.pool, name, timeout):
             yield
 
+    @asynccontextmanager
+    async def try_lock(self, name: str, timeout: timedelta = timedelta(0)):
+        lock = AdvisoryLock(self.pool, name, timeout)
+        acquired = await lock.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await lock.release()
+
     async def xact_lock(self, name: str, timeout: timedelta | None = None) -> bool:
         transaction = current_transaction.get()
 
         if not transaction:
             raise TransactionNotExists
 
-        params = [hash(name)]
-        query = "SELECT pg_advisory_xact_lock($1)"
-        if timeout:
-            params.append(int(timeout.total_seconds() * 1000))
-            query = "SELECT pg_advisory_xact_lock_with_timeout($1, $2)"
+        return await acquire_advisory_lock(transaction, advisory_lock_key(name), timeout, xact=True)
+
 
-        return await transaction.fetchval(query, *params) if timeout else True
+def _affected_rows(status: str) -> int:
+    # Command status is like "COPY 10" or "INSERT 0 10"
+    return int(status.rsplit(" ", 1)[-1])
@@ -0,0 +1,97 @@
+import re
+from dataclasses import dataclass
+from typing import Any
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from data.storage.postgres.parameters import Parameters
+
+# Quoted spans, comments and "::" casts are matched as a whole, so a ":name" inside them isn't a placeholder.
+# Placeholder isn't preceded by a word character, so "12:30" isn't one either
+_TOKEN = re.compile(
+    r"""
+    (?<!\w)[Ee]'(?:[^'\\]|\\.|'')*'
+    | '(?:[^']|'')*'
+    | "(?:[^"]|"")*"
+    | \$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$
+    | --[^\n]*
+    | /\*.*?\*/
+    | ::
+    | (?<!\w):(?P<name>[A-Za-z_]\w*)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """
+    SQL built once, with named placeholders (":name") replaced by positional ones.
+    Quoted literals and identifiers, dollar-quoted strings and comments are left as they are.
+    """
+
+    sql: str
+    names: tuple[str, ...]
+
+    @classmethod
+    def from_sql(cls, sql: str) -> "CompiledQuery":
+        names: list[str] = []
+
+        def replace(match: re.Match) -> str:
+            name = match.group("name")
+            if name is None:
+                return match.group(0)
+            if name not in names:
+                names.append(name)
+            return f"${names.index(name) + 1}"
+
+        return cls(sql=_TOKEN.sub(replace, sql), names=tuple(names))
+
+    def parameters(self, **values: Any) -> Parameters:
+        if missing := [name for name in self.names if name not in values]:
+            raise ValueError(f"Missing query parameters: {', '.join(missing)}")
+
+        return Parameters(*(values[name] for name in self.names))
+
+    def __str__(self) -> str:
+        return self.sql
+
+
+class PreparedStatements:
+    """
+    Statements of registered queries are prepared on every new pool connection by the init hook,
+    other compiled queries on their first run on a connection. They're kept until the connection closes.
+    """
+
+    def __init__(self):
+        self._queries: dict[str, CompiledQuery] = {}
+        self._statements: dict[asyncpg.Connection, dict[str, PreparedStatement]] = {}
+
+    def register(self, query: CompiledQuery) -> CompiledQuery:
+        self._queries[query.sql] = query
+        return query
+
+    async def prepare(self, connection: asyncpg.Connection) -> None:
+        for query in list(self._queries.values()):
+            await self.get(connection, query)
+
+    async def get(self, connection: asyncpg.Connection, query: CompiledQuery) -> PreparedStatement:
+        # Pool hands out proxies of connections
+        connection = getattr(connection, "_con", connection)
+
+        if (statements := self._statements.get(connection)) is None:
+            statements = self._statements[connection] = {}
+            connection.add_termination_listener(self._forget)
+
+        if (statement := statements.get(query.sql)) is None:
+            statement = statements[query.sql] = await connection.prepare(query.sql)
+
+        # PreparedStatement can't be used after its connection is released to the pool, while the statement
+        # on the server stays until the connection closes, so a new one is made for every run
+        return type(statement)(connection, query.sql, statement._state)
+
+    def _forget(self, connection: asyncpg.Connection) -> None:
+        self._statements.pop(connection, None)
+
+
+prepared_statements = PreparedStatements()
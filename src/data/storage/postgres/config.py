@@ -3,3 +3,20 @@ from pydantic import BaseModel
 
 class PostgresConfig(BaseModel):
     dsn: str
+
+    # min_size connections are opened on init, so the first requests don't wait for connecting
+    min_size: int = 5
+    max_size: int = 20
+    # Connections are replaced after serving max_queries queries or being idle for max_inactive_connection_lifetime
+    max_queries: int = 50000
+    max_inactive_connection_lifetime: float = 300.0
+    # Default timeout of a query in seconds, None means no timeout
+    command_timeout: float | None = 60.0
+    # Must be 0 behind PgBouncer in transaction mode, prepared statements don't survive a connection switch
+    statement_cache_size: int = 100
+    max_cached_statement_lifetime: int = 300
+
+    # Reads outside of transactions go to the least busy replica, the primary is used while no replica is available
+    replica_dsns: list[str] = []
+    # Seconds a replica is skipped for after a connection error
+    replica_retry_interval: float = 5.0
@@ -1,2 +1,6 @@
 def escape_for_like(value: str) -> str:
     return value.lower().replace("\\", r"\\").replace("%", r"\%").replace("_", r"\_")
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
@@ -5,5 +5,13 @@ class TransactionIsolationMismatch(AppException):
     pass
 
 
+class TransactionModeMismatch(AppException):
+    pass
+
+
 class TransactionNotExists(AppException):
     pass
+
+
+class LockNotAcquired(AppException):
+    pass
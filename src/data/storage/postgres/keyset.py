@@ -0,0 +1,139 @@
+import datetime
+import decimal
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Mapping, Sequence, TypeVar
+
+from data.storage import cursor
+from data.storage.postgres.parameters import Parameters
+from data.storage.postgres.query_builder import Query
+from domain.errors.common import InvalidCursor
+
+TRow = TypeVar("TRow", bound=Mapping)
+
+# Values which JSON can't keep, they're stored in cursors as [type name, str(value)]
+_TYPES: dict[str, tuple[type, Callable[[str], Any]]] = {
+    # datetime is a date subclass, so it's checked first
+    "datetime": (datetime.datetime, datetime.datetime.fromisoformat),
+    "date": (datetime.date, datetime.date.fromisoformat),
+    "uuid": (uuid.UUID, uuid.UUID),
+    "decimal": (decimal.Decimal, decimal.Decimal),
+}
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """
+    SQL expression to sort by, e.g. a column or enum_to_sort_value(). Expression must not be NULL.
+    Its value is selected as "_sort_<name>" to build the next cursor from the last row.
+    value_type is the Python type of the value, cursor values of another type are rejected.
+    """
+
+    name: str
+    expression: str
+    value_type: type
+    descending: bool = False
+
+    @property
+    def alias(self) -> str:
+        return f"_sort_{self.name}"
+
+
+@dataclass
+class KeysetPage(Generic[TRow]):
+    rows: list[TRow]
+    # None on the last page
+    next_cursor: str | None
+
+
+class KeysetPaginator:
+    """
+    Pagination by the values of the last row instead of OFFSET, so every page costs the same at any depth.
+    Last sort key must be unique (e.g. id), otherwise rows with equal keys could be skipped between pages.
+    """
+
+    def __init__(self, sort_keys: Sequence[SortKey], page_size: int):
+        assert sort_keys, "At least one sort key is required"
+        self.sort_keys = list(sort_keys)
+        self.page_size = page_size
+
+    def paginate(self, query: Query, parameters: Parameters, after: str | None = None) -> Query:
+        """Adds sort keys, the cursor predicate, ORDER BY and LIMIT to query, which must have no ORDER BY or LIMIT"""
+        query.SELECT(*(f"{key.expression} AS {key.alias}" for key in self.sort_keys))
+
+        if after is not None:
+            values = self._decode(after)
+            query.WHERE(self._predicate([parameters.add(value) for value in values]))
+
+        query.ORDER_BY(*(f"{key.expression} {'DESC' if key.descending else 'ASC'}" for key in self.sort_keys))
+        # One more row tells whether there is a next page
+        query.LIMIT(parameters.add(self.page_size + 1))
+        return query
+
+    def page(self, rows: Sequence[TRow]) -> KeysetPage[TRow]:
+        page = list(rows[: self.page_size])
+        if len(rows) <= self.page_size:
+            return KeysetPage(rows=page, next_cursor=None)
+
+        last = page[-1]
+        return KeysetPage(rows=page, next_cursor=self._encode([last[key.alias] for key in self.sort_keys]))
+
+    def _predicate(self, placeholders: list[str]) -> str:
+        keys = self.sort_keys
+
+        # Row comparison can use a composite index, but only when all keys are sorted in one direction
+        if all(key.descending == keys[0].descending for key in keys):
+            operator = "<" if keys[0].descending else ">"
+            expressions = ", ".join(key.expression for key in keys)
+            return f"({expressions}) {operator} ({', '.join(placeholders)})"
+
+        # (a > $1) OR (a = $1 AND b < $2) OR ...
+        alternatives = []
+        for index, key in enumerate(keys):
+            conditions = [f"{previous.expression} = {placeholders[i]}" for i, previous in enumerate(keys[:index])]
+            conditions.append(f"{key.expression} {'<' if key.descending else '>'} {placeholders[index]}")
+            alternatives.append(f"({' AND '.join(conditions)})")
+
+        return f"({' OR '.join(alternatives)})"
+
+    def _encode(self, values: list[Any]) -> str:
+        return cursor.encode({"keys": [key.name for key in self.sort_keys], "values": [_dump(v) for v in values]})
+
+    def _decode(self, after: str) -> list[Any]:
+        data = cursor.decode(after)
+
+        # Cursor of another listing or ordering
+        if data.get("keys") != [key.name for key in self.sort_keys]:
+            raise InvalidCursor()
+
+        # Cursor comes from the client, a truncated one would make the predicate sides differ in length
+        values = data.get("values")
+        if not isinstance(values, list) or len(values) != len(self.sort_keys):
+            raise InvalidCursor()
+
+        try:
+            return [_load(value, key.value_type) for value, key in zip(values, self.sort_keys)]
+        except (KeyError, TypeError, ValueError) as error:
+            raise InvalidCursor() from error
+
+
+def _dump(value: Any) -> Any:
+    for name, (value_type, _) in _TYPES.items():
+        if isinstance(value, value_type):
+            return [name, value.isoformat() if isinstance(value, datetime.date) else str(value)]
+
+    return value
+
+
+def _load(value: Any, value_type: type) -> Any:
+    for name, (tagged_type, load) in _TYPES.items():
+        if issubclass(value_type, tagged_type):
+            if not (isinstance(value, list) and len(value) == 2 and value[0] == name and isinstance(value[1], str)):
+                raise TypeError(f"Expected {name} value, got {value!r}")
+            return load(value[1])
+
+    # bool is an int subclass, but True isn't a valid id
+    if not isinstance(value, value_type) or (isinstance(value, bool) and value_type is not bool):
+        raise TypeError(f"Expected {value_type.__name__} value, got {value!r}")
+
+    return value
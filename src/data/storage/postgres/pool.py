@@ -0,0 +1,55 @@
+import time
+from dataclasses import dataclass
+
+import asyncpg
+
+
+@dataclass
+class PoolStats:
+    size: int
+    idle: int
+    max_size: int
+    # Callers waiting for a connection right now
+    waiting: int
+    acquired: int
+    # Seconds spent waiting for connections, in total and the longest single wait
+    acquire_time: float
+    max_acquire_time: float
+
+
+class MeteredPool(asyncpg.pool.Pool):
+    """asyncpg pool which measures how long callers wait for connections"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.acquired = 0
+        self.acquire_time = 0.0
+        self.max_acquire_time = 0.0
+
+    async def _acquire(self, timeout):
+        # Every acquire goes through here, including the ones made by Pool.fetch, execute etc.
+        started_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            connection = await super()._acquire(timeout)
+        finally:
+            # Wait which ended with a timeout counts as waiting time too
+            elapsed = time.perf_counter() - started_at
+            self.waiting -= 1
+            self.acquire_time += elapsed
+            self.max_acquire_time = max(self.max_acquire_time, elapsed)
+
+        self.acquired += 1
+        return connection
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            size=self.get_size(),
+            idle=self.get_idle_size(),
+            max_size=self.get_max_size(),
+            waiting=self.waiting,
+            acquired=self.acquired,
+            acquire_time=self.acquire_time,
+            max_acquire_time=self.max_acquire_time,
+        )
@@ -1,6 +1,8 @@
 import functools
 import textwrap
 
+from data.storage.postgres.compiled_query import CompiledQuery
+
 
 class Query:
     keywords = [
@@ -28,6 +30,10 @@ class Query:
     def __str__(self):
         return "".join(self._lines())
 
+    def compile(self) -> CompiledQuery:
+        """Builds SQL once, keep the result instead of building the query on every call"""
+        return CompiledQuery.from_sql(str(self))
+
     def add(self, keyword, *args):
         target = self.data[keyword]
 
@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+import pytest
+from data.storage.postgres.advisory_lock import AdvisoryLock, acquire_advisory_lock, advisory_lock_key
+from data.storage.postgres.exception import LockNotAcquired
+from tests.asyncpg_connection_test_impl import TestConnection, TestPool
+
+
+@pytest.mark.unit
+def test_advisory_lock_key_is_stable():
+    # Fixed value, so the key doesn't depend on PYTHONHASHSEED of a process
+    assert advisory_lock_key("job") == -5882027576122421468
+    assert advisory_lock_key("job") != advisory_lock_key("job2")
+
+
+@pytest.mark.unit
+def test_advisory_lock_key_fits_bigint():
+    for name in ["", "job", "x" * 1000]:
+        assert -(2**63) <= advisory_lock_key(name) < 2**63
+
+
+@pytest.mark.unit
+async def test_acquire_waits_without_timeout():
+    connection = TestConnection()
+
+    assert await acquire_advisory_lock(connection, 1) is True
+    assert connection.log == ["SELECT pg_advisory_lock($1)"]
+    assert connection.locks == [1]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("xact", [False, True])
+async def test_acquire_with_zero_timeout_only_tries(xact):
+    connection = TestConnection()
+    connection.held_by_others.add(2)
+    scope = "_xact" if xact else ""
+
+    assert await acquire_advisory_lock(connection, 1, timedelta(0), xact=xact) is True
+    assert await acquire_advisory_lock(connection, 2, timedelta(0), xact=xact) is False
+    assert connection.log == [f"SELECT pg_try_advisory{scope}_lock($1)"] * 2
+    assert (connection.xact_locks if xact else connection.locks) == [1]
+
+
+@pytest.mark.unit
+async def test_acquire_with_timeout_restores_lock_timeout():
+    connection = TestConnection()
+    connection.session_settings["lock_timeout"] = connection.settings["lock_timeout"] = "5s"
+
+    assert await acquire_advisory_lock(connection, 1, timedelta(milliseconds=200)) is True
+    assert connection.log == [
+        "SELECT current_setting('lock_timeout')",
+        "SELECT set_config('lock_timeout', $1, false)",
+        "SELECT pg_advisory_lock($1)",
+        "SELECT set_config('lock_timeout', $1, false)",
+    ]
+    assert connection.settings["lock_timeout"] == connection.session_settings["lock_timeout"] == "5s"
+
+
+@pytest.mark.unit
+async def test_acquire_with_timeout_fails():
+    connection = TestConnection()
+    connection.held_by_others.add(1)
+
+    assert await acquire_advisory_lock(connection, 1, timedelta(milliseconds=200)) is False
+    assert connection.settings["lock_timeout"] == connection.session_settings["lock_timeout"] == "0"
+    assert connection.locks == []
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("held", [False, True])
+async def test_xact_acquire_with_timeout_uses_savepoint(held):
+    connection = TestConnection()
+    if held:
+        connection.held_by_others.add(1)
+
+    async with connection.transaction():
+        assert await acquire_advisory_lock(connection, 1, timedelta(milliseconds=200), xact=True) is not held
+        # Failed lock is rolled back to the savepoint, so the transaction can go on
+        assert connection.settings["lock_timeout"] == "0"
+        assert connection.xact_locks == ([] if held else [1])
+        await connection.execute("w1")
+
+    assert connection.log == [
+        "BEGIN",
+        "SELECT current_setting('lock_timeout')",
+        "SAVEPOINT",
+        "SELECT set_config('lock_timeout', $1, true)",
+        "SELECT pg_advisory_xact_lock($1)",
+        *(["ROLLBACK TO SAVEPOINT"] if held else ["SELECT set_config('lock_timeout', $1, true)", "RELEASE SAVEPOINT"]),
+        "w1",
+        "COMMIT",
+    ]
+    assert connection.xact_locks == []
+
+
+@pytest.mark.unit
+async def test_advisory_lock_holds_pool_connection():
+    pool = TestPool()
+    lock = AdvisoryLock(pool, "job", timedelta(0))
+    key = advisory_lock_key("job")
+
+    assert await lock.acquire() is True
+    assert pool.acquired == 1
+    assert pool.connection.locks == [key]
+
+    await lock.release()
+    assert pool.acquired == 0
+    assert pool.connection.locks == []
+    assert pool.connection.log[-1] == "SELECT pg_advisory_unlock($1)"
+
+
+@pytest.mark.unit
+async def test_advisory_lock_not_acquired():
+    pool = TestPool()
+    pool.connection.held_by_others.add(advisory_lock_key("job"))
+    lock = AdvisoryLock(pool, "job", timedelta(0))
+
+    assert await lock.acquire() is False
+    assert pool.acquired == 0
+
+    with pytest.raises(LockNotAcquired):
+        async with lock:
+            pass
+    assert pool.acquired == 0
+    assert "SELECT pg_advisory_unlock($1)" not in pool.connection.log
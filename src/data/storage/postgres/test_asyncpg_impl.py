@@ -0,0 +1,481 @@
+from contextlib import aclosing
+from datetime import timedelta
+
+import pytest
+from data.storage.postgres.advisory_lock import advisory_lock_key
+from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase
+from data.storage.postgres.compiled_query import CompiledQuery
+from data.storage.postgres.config import PostgresConfig
+from data.storage.postgres.exception import (
+    TransactionIsolationMismatch,
+    TransactionModeMismatch,
+    TransactionNotExists,
+)
+from data.storage.postgres.transaction import current_transaction
+from tests.asyncpg_connection_test_impl import TestPool
+
+
+@pytest.fixture
+async def make_db(monkeypatch):
+    pools: dict[str, TestPool] = {}
+    unreachable: set[str] = set()
+    databases: list[AsyncpgPostgresDatabase] = []
+
+    async def create_pool(self, dsn: str, settings: PostgresConfig):
+        if dsn in unreachable:
+            raise ConnectionRefusedError
+
+        pools[dsn] = TestPool(dsn)
+        return pools[dsn]
+
+    monkeypatch.setattr(AsyncpgPostgresDatabase, "_create_pool", create_pool)
+
+    async def make(**settings) -> AsyncpgPostgresDatabase:
+        db = AsyncpgPostgresDatabase()
+        await db.init(PostgresConfig(dsn="primary", **settings))
+        databases.append(db)
+        return db
+
+    make.pools = pools
+    make.unreachable = unreachable
+    yield make
+
+    for db in databases:
+        await db.close()
+
+
+def served_by(make_db, query: str) -> list[str]:
+    return [dsn for dsn, pool in make_db.pools.items() if query in pool.connection.log]
+
+
+@pytest.mark.unit
+async def test_reads_go_to_least_busy_replica(make_db):
+    db = await make_db(replica_dsns=["replica1", "replica2"])
+
+    await db.fetch("q1")
+    await db.fetch("q2")
+    assert served_by(make_db, "q1") == ["replica1"]
+    assert served_by(make_db, "q2") == ["replica2"]
+
+    make_db.pools["replica1"].size = 3
+    await db.fetchval("q3")
+    await db.fetchrow("q4")
+    assert served_by(make_db, "q3") == ["replica2"]
+    assert served_by(make_db, "q4") == ["replica2"]
+
+    await db.execute("w1")
+    async with db.transaction():
+        await db.fetch("q5")
+    assert served_by(make_db, "w1") == ["primary"]
+    assert served_by(make_db, "q5") == ["primary"]
+
+
+@pytest.mark.unit
+async def test_use_primary(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+
+    await db.fetch("q1", use_primary=True)
+    await db.fetchrow("q2", use_primary=True)
+    await db.fetchval("q3", use_primary=True)
+
+    assert served_by(make_db, "q1") == ["primary"]
+    assert served_by(make_db, "q2") == ["primary"]
+    assert served_by(make_db, "q3") == ["primary"]
+
+
+@pytest.mark.unit
+async def test_read_fails_over_to_primary(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+    make_db.pools["replica1"].connection.error = ConnectionResetError()
+
+    await db.fetch("q1")
+    assert served_by(make_db, "q1") == ["primary", "replica1"]
+
+    # Replica is skipped until replica_retry_interval passes
+    await db.fetch("q2")
+    assert served_by(make_db, "q2") == ["primary"]
+
+
+@pytest.mark.unit
+async def test_slow_replica_read_is_not_retried(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+    make_db.pools["replica1"].connection.error = TimeoutError()
+
+    with pytest.raises(TimeoutError):
+        await db.fetch("q1")
+
+    assert served_by(make_db, "q1") == ["replica1"]
+    make_db.pools["replica1"].connection.error = None
+    await db.fetch("q2")
+    assert served_by(make_db, "q2") == ["replica1"]
+
+
+@pytest.mark.unit
+async def test_unreachable_replica_on_init(make_db):
+    make_db.unreachable.add("replica1")
+    db = await make_db(replica_dsns=["replica1"], replica_retry_interval=0)
+
+    assert db.replica_pool_stats() == [None]
+    await db.fetch("q1")
+    assert served_by(make_db, "q1") == ["primary"]
+
+    # Pool is created once the replica is reachable again
+    make_db.unreachable.clear()
+    await db.fetch("q2")
+    assert served_by(make_db, "q2") == ["replica1"]
+    assert db.replica_pool_stats()[0] is not None
+
+
+@pytest.mark.unit
+async def test_read_only_transaction_runs_on_replica_when_asked(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+
+    async with db.transaction(read_only=True, use_replica=True):
+        await db.fetch("q1")
+    # Read only transaction might need to see its own earlier writes, so it stays on the primary by default
+    async with db.transaction(read_only=True):
+        await db.fetch("q2")
+    async with db.transaction():
+        await db.fetch("q3")
+
+    assert served_by(make_db, "q1") == ["replica1"]
+    assert served_by(make_db, "q2") == ["primary"]
+    assert served_by(make_db, "q3") == ["primary"]
+
+
+@pytest.mark.unit
+async def test_replica_transaction_must_be_read_only(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+
+    with pytest.raises(AssertionError):
+        async with db.transaction(use_replica=True):
+            pass
+
+
+async def records(*rows: tuple):
+    for row in rows:
+        yield row
+
+
+@pytest.mark.unit
+async def test_copy_records_to_table(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    assert await db.copy_records_to_table("items", records=records((1, "a"), (2, "b")), columns=["id", "name"]) == 2
+    assert connection.copied["items"] == [(1, "a"), (2, "b")]
+    assert connection.log == ["BEGIN", "COPY items", "COMMIT"]
+
+
+@pytest.mark.unit
+async def test_upsert_records(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+    connection.results["execute"] = "INSERT 0 2"
+
+    inserted = await db.upsert_records(
+        "items",
+        records=[(1, "a", 10), (2, "b", 20)],
+        columns=["id", "name", "price"],
+        conflict_columns=["id"],
+        schema_name="shop",
+    )
+
+    assert inserted == 2
+    begin, create, copy, insert, drop, commit = connection.log
+    temp_table = copy.removeprefix("COPY ")
+    assert (begin, commit) == ("BEGIN", "COMMIT")
+    assert create == (
+        f"CREATE TEMP TABLE {temp_table} ON COMMIT DROP "
+        'AS SELECT "id", "name", "price" FROM "shop"."items" WITH NO DATA'
+    )
+    assert insert == (
+        f'INSERT INTO "shop"."items" ("id", "name", "price") SELECT "id", "name", "price" FROM {temp_table} '
+        'ON CONFLICT ("id") DO UPDATE SET "name" = EXCLUDED."name", "price" = EXCLUDED."price"'
+    )
+    assert drop == f"DROP TABLE {temp_table}"
+    assert connection.copied[temp_table] == [(1, "a", 10), (2, "b", 20)]
+
+
+@pytest.mark.unit
+async def test_upsert_records_without_updates(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    await db.upsert_records("items", records=[(1, 2)], columns=["a", "b"], conflict_columns=["a", "b"])
+    assert connection.log[3].endswith('ON CONFLICT ("a", "b") DO NOTHING')
+
+    connection.log.clear()
+    await db.upsert_records("items", records=[(1, 2)], columns=["a", "b"], conflict_columns=["a"], update_columns=["b"])
+    assert connection.log[3].endswith('ON CONFLICT ("a") DO UPDATE SET "b" = EXCLUDED."b"')
+
+
+@pytest.mark.unit
+async def test_upsert_empty_records(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+    connection.results["execute"] = "INSERT 0 0"
+
+    assert await db.upsert_records("items", records=records(), columns=["id"], conflict_columns=["id"]) == 0
+    assert list(connection.copied.values()) == [[]]
+    assert connection.log[-1] == "COMMIT"
+
+
+@pytest.mark.unit
+async def test_upsert_records_in_transaction(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    async with db.transaction():
+        await db.upsert_records("items", records=[(1,)], columns=["id"], conflict_columns=["id"])
+
+    # Upsert joins the current transaction instead of opening its own
+    assert [entry for entry in connection.log if entry in ("BEGIN", "COMMIT")] == ["BEGIN", "COMMIT"]
+
+
+@pytest.mark.unit
+async def test_cursor_prefetches_pages(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+    connection.cursor_rows = list(range(5))
+
+    pages = []
+    async for page in db.cursor_pages("q", step=2):
+        # Next page is requested before the current one is processed
+        assert connection.log.count("FETCH 2") == len(pages) + 1
+        pages.append(page)
+
+    assert pages == [[0, 1], [2, 3], [4]]
+    assert connection.log == ["BEGIN", "q", "FETCH 2", "FETCH 2", "FETCH 2", "FETCH 2", "COMMIT"]
+
+
+@pytest.mark.unit
+async def test_cursor_stops_on_break(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+    connection.cursor_rows = list(range(10))
+
+    rows = []
+    async with aclosing(db.cursor("q", step=2)) as cursor:
+        async for row in cursor:
+            rows.append(row)
+            if row == 2:
+                break
+
+    assert rows == [0, 1, 2]
+    # Prefetch in flight completes before the cursor's transaction ends, it would fail on a busy connection
+    assert connection.log == ["BEGIN", "q", "FETCH 2", "FETCH 2", "FETCH 2", "ROLLBACK"]
+    assert connection._top_xact is None
+
+
+@pytest.mark.unit
+async def test_cursor_uses_current_transaction(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+    connection.cursor_rows = list(range(4))
+
+    async with db.transaction():
+        rows = []
+        async for row in db.cursor("q", step=2):
+            # Without prefetch the connection is free for other queries between pages
+            await db.execute(f"row {row}")
+            rows.append(row)
+
+    assert rows == [0, 1, 2, 3]
+    assert connection.log == [
+        "BEGIN",
+        "q",
+        "FETCH 2",
+        "row 0",
+        "row 1",
+        "FETCH 2",
+        "row 2",
+        "row 3",
+        "FETCH 2",
+        "COMMIT",
+    ]
+
+
+@pytest.mark.unit
+async def test_nested_transaction_rollback_keeps_outer_work(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    async with db.transaction():
+        await db.execute("w1")
+
+        with pytest.raises(ValueError):
+            async with db.transaction():
+                await db.execute("w2")
+                raise ValueError
+
+        assert current_transaction.get() is connection
+        await db.execute("w3")
+
+    assert connection.log == ["BEGIN", "w1", "SAVEPOINT", "w2", "ROLLBACK TO SAVEPOINT", "w3", "COMMIT"]
+    assert current_transaction.get() is None
+
+
+@pytest.mark.unit
+async def test_nested_transaction_timeouts_are_restored(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    async with db.transaction(statement_timeout=timedelta(seconds=5)):
+        assert connection.settings["statement_timeout"] == "5000ms"
+
+        async with db.transaction(statement_timeout=timedelta(milliseconds=100), lock_timeout=timedelta(seconds=1)):
+            assert connection.settings == {"statement_timeout": "100ms", "lock_timeout": "1000ms"}
+        # Released savepoint would keep its local settings until the end of the top-level transaction
+        assert connection.settings == {"statement_timeout": "5000ms", "lock_timeout": "0"}
+
+        with pytest.raises(ValueError):
+            async with db.transaction(statement_timeout=timedelta(milliseconds=100)):
+                assert connection.settings["statement_timeout"] == "100ms"
+                raise ValueError
+        assert connection.settings == {"statement_timeout": "5000ms", "lock_timeout": "0"}
+
+    assert "RELEASE SAVEPOINT" in connection.log
+    assert "ROLLBACK TO SAVEPOINT" in connection.log
+
+
+@pytest.mark.unit
+async def test_transaction_mode(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+    primary = make_db.pools["primary"].connection
+
+    # Hot standby doesn't support serializable transactions, so it runs on the primary
+    async with db.transaction("serializable", read_only=True, deferrable=True, use_replica=True):
+        transaction = primary._top_xact
+        assert (transaction._isolation, transaction._readonly, transaction._deferrable) == (
+            "serializable",
+            True,
+            True,
+        )
+
+    async with db.transaction("repeatable_read"):
+        transaction = primary._top_xact
+        assert (transaction._isolation, transaction._readonly, transaction._deferrable) == (
+            "repeatable_read",
+            False,
+            False,
+        )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "outer, inner, error",
+    [
+        ({}, {"isolation": "serializable"}, TransactionIsolationMismatch),
+        ({}, {"read_only": True}, TransactionModeMismatch),
+        ({"read_only": True}, {}, TransactionModeMismatch),
+        (
+            {"isolation": "serializable", "read_only": True},
+            {"isolation": "serializable", "read_only": True, "deferrable": True},
+            TransactionModeMismatch,
+        ),
+    ],
+)
+async def test_nested_transaction_mode_mismatch(make_db, outer, inner, error):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    async with db.transaction(**outer):
+        with pytest.raises(error):
+            async with db.transaction(**inner):
+                pass
+
+        await db.execute("w1")
+
+    assert connection.log == ["BEGIN", "w1", "COMMIT"]
+
+
+@pytest.mark.unit
+async def test_nested_transaction_in_deferrable_one(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    async with db.transaction("serializable", read_only=True, deferrable=True):
+        async with db.transaction("serializable", read_only=True):
+            await db.fetch("q1")
+
+    assert connection.log == ["BEGIN", "SAVEPOINT", "q1", "RELEASE SAVEPOINT", "COMMIT"]
+
+
+@pytest.mark.unit
+async def test_lock(make_db):
+    db = await make_db()
+    pool = make_db.pools["primary"]
+
+    async with db.lock("job"):
+        assert pool.connection.locks == [advisory_lock_key("job")]
+        # Lock is held on its own pool connection, not in a transaction
+        assert pool.acquired == 1
+        assert current_transaction.get() is None
+
+    assert pool.connection.locks == []
+    assert pool.acquired == 0
+
+
+@pytest.mark.unit
+async def test_try_lock(make_db):
+    db = await make_db()
+    pool = make_db.pools["primary"]
+    pool.connection.held_by_others.add(advisory_lock_key("job"))
+
+    async with db.try_lock("job") as acquired:
+        assert acquired is False
+        assert pool.acquired == 0
+
+    async with db.try_lock("job2") as acquired:
+        assert acquired is True
+        assert pool.connection.locks == [advisory_lock_key("job2")]
+
+    assert pool.connection.locks == []
+
+
+@pytest.mark.unit
+async def test_xact_lock(make_db):
+    db = await make_db()
+    connection = make_db.pools["primary"].connection
+
+    with pytest.raises(TransactionNotExists):
+        await db.xact_lock("job")
+
+    async with db.transaction():
+        assert await db.xact_lock("job", timedelta(0)) is True
+        assert connection.xact_locks == [advisory_lock_key("job")]
+
+    assert connection.xact_locks == []
+
+
+@pytest.mark.unit
+async def test_compiled_query_runs_through_prepared_statement(make_db):
+    db = await make_db(replica_dsns=["replica1"])
+    primary, replica = make_db.pools["primary"].connection, make_db.pools["replica1"].connection
+    query = CompiledQuery.from_sql("SELECT * FROM t WHERE id = :id")
+    primary.results["execute"] = "UPDATE 2"
+
+    await db.fetch(query, 1)
+    await db.fetchrow(query, 2)
+    assert await db.execute(query, 3) == "UPDATE 2"
+    async with db.transaction():
+        await db.fetchval(query, 4)
+
+    assert replica.log == ["PREPARE SELECT * FROM t WHERE id = $1", *["EXECUTE SELECT * FROM t WHERE id = $1"] * 2]
+    assert primary.log == [
+        "PREPARE SELECT * FROM t WHERE id = $1",
+        "EXECUTE SELECT * FROM t WHERE id = $1",
+        "BEGIN",
+        "EXECUTE SELECT * FROM t WHERE id = $1",
+        "COMMIT",
+    ]
+
+
+@pytest.mark.unit
+async def test_compiled_query_without_statement_cache(make_db):
+    db = await make_db(statement_cache_size=0)
+    connection = make_db.pools["primary"].connection
+
+    await db.fetch(CompiledQuery.from_sql("SELECT * FROM t WHERE id = :id"), 1)
+    assert connection.log == ["SELECT * FROM t WHERE id = $1"]
@@ -0,0 +1,88 @@
+import pytest
+from data.storage.postgres.compiled_query import CompiledQuery, PreparedStatements
+from data.storage.postgres.query_builder import Query
+from tests.asyncpg_connection_test_impl import TestConnection
+
+
+@pytest.mark.unit
+def test_compile_named_placeholders():
+    query = (
+        Query()
+        .SELECT("id", "created_at::date")
+        .FROM("users")
+        .WHERE("id = :id", "name = :name OR nickname = :name", "created_at > '2024-01-01 12:30'")
+        .compile()
+    )
+
+    assert query.names == ("id", "name")
+    assert "id = $1" in query.sql
+    assert "name = $2 OR nickname = $2" in query.sql
+    assert "created_at::date" in query.sql
+    assert "'2024-01-01 12:30'" in query.sql
+    assert list(query.parameters(name="bob", id=1)) == [1, "bob"]
+
+
+@pytest.mark.unit
+def test_compiled_query_missing_parameters():
+    query = CompiledQuery.from_sql("SELECT * FROM users WHERE id = :id AND name = :name")
+
+    with pytest.raises(ValueError, match="name"):
+        query.parameters(id=1)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT ':name'",
+        "SELECT 'it''s :name'",
+        "SELECT E'it\\'s :name'",
+        'SELECT 1 AS ":name"',
+        "SELECT $$:name$$",
+        "SELECT $body$ ':name' $body$",
+        "SELECT 1 -- :name",
+        "SELECT /* :name */ 1",
+        "SELECT now()::date",
+        "SELECT '12:30'::time",
+    ],
+)
+def test_quoted_spans_keep_colons(sql):
+    query = CompiledQuery.from_sql(sql)
+
+    assert query.sql == sql
+    assert query.names == ()
+
+
+@pytest.mark.unit
+def test_placeholder_after_quoted_span():
+    query = CompiledQuery.from_sql("SELECT 'a:b', \"c:d\", :id::int, $$:x$$ || :name")
+
+    assert query.sql == "SELECT 'a:b', \"c:d\", $1::int, $$:x$$ || $2"
+    assert query.names == ("id", "name")
+
+
+@pytest.mark.unit
+async def test_prepared_statements_are_kept_per_connection():
+    statements = PreparedStatements()
+    registered = statements.register(CompiledQuery.from_sql("SELECT :id"))
+    other = CompiledQuery.from_sql("SELECT :name::text")
+    connection, another_connection = TestConnection(), TestConnection()
+
+    # Init hook prepares registered queries, others are prepared on their first run
+    await statements.prepare(connection)
+    assert connection.log == ["PREPARE SELECT $1"]
+
+    first = await statements.get(connection, registered)
+    await statements.get(connection, other)
+    second = await statements.get(connection, registered)
+    await statements.get(another_connection, registered)
+
+    assert connection.log == ["PREPARE SELECT $1", "PREPARE SELECT $1::text"]
+    assert another_connection.log == ["PREPARE SELECT $1"]
+    # New statement object on the same server-side statement, the old one is invalid once the connection is released
+    assert first is not second
+    assert first._state is second._state
+
+    await connection.close()
+    await statements.get(connection, registered)
+    assert connection.log[-1] == "PREPARE SELECT $1"
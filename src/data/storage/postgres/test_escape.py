@@ -1,5 +1,10 @@
-from data.storage.postgres.escape import escape_for_like
+from data.storage.postgres.escape import escape_for_like, quote_identifier
 
 
 def test_escape_for_like():
     assert escape_for_like(r"%__\d") == r"\%\_\_\\d"
+
+
+def test_quote_identifier():
+    assert quote_identifier("user") == '"user"'
+    assert quote_identifier('a"b') == '"a""b"'
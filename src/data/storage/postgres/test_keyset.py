@@ -0,0 +1,153 @@
+import datetime
+import sqlite3
+import uuid
+
+import pytest
+from data.storage.cursor import decode, encode
+from data.storage.postgres.keyset import KeysetPaginator, SortKey
+from data.storage.postgres.parameters import Parameters
+from data.storage.postgres.query_builder import Query
+from domain.errors.common import InvalidCursor
+
+created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+row_id = uuid.UUID(int=1)
+
+
+def paginator(*sort_keys: SortKey, page_size: int = 2) -> KeysetPaginator:
+    return KeysetPaginator(sort_keys, page_size)
+
+
+@pytest.mark.unit
+def test_first_page():
+    parameters = Parameters()
+    query = paginator(SortKey("id", "t.id", int)).paginate(Query().SELECT("t.id").FROM("t"), parameters)
+
+    assert "WHERE" not in str(query)
+    assert "t.id AS _sort_id" in str(query)
+    assert "t.id ASC" in str(query)
+    assert list(parameters) == [3]
+
+
+@pytest.mark.unit
+def test_row_comparison_for_one_direction():
+    keys = paginator(
+        SortKey("created_at", "t.created_at", datetime.datetime, descending=True),
+        SortKey("id", "t.id", uuid.UUID, descending=True),
+    )
+    after = keys.page([{"_sort_created_at": created_at, "_sort_id": row_id}] * 3).next_cursor
+
+    parameters = Parameters("status")
+    query = keys.paginate(Query().SELECT("t.id").FROM("t").WHERE("t.status = $1"), parameters, after)
+
+    assert "(t.created_at, t.id) < ($2, $3)" in str(query)
+    assert list(parameters) == ["status", created_at, row_id, 3]
+
+
+@pytest.mark.unit
+def test_expanded_predicate_for_mixed_directions():
+    keys = paginator(SortKey("score", "t.score", int, descending=True), SortKey("id", "t.id", int))
+    parameters = Parameters()
+
+    query = keys.paginate(Query().SELECT("t.id").FROM("t"), parameters, keys._encode([5, 10]))
+
+    assert "((t.score < $1) OR (t.score = $1 AND t.id > $2))" in str(query)
+    assert list(parameters) == [5, 10, 3]
+
+
+@pytest.mark.unit
+def test_page_with_ties():
+    keys = paginator(SortKey("score", "t.score", int), SortKey("id", "t.id", int))
+    rows = [{"id": 1, "_sort_score": 7, "_sort_id": 1}, {"id": 2, "_sort_score": 7, "_sort_id": 2}]
+
+    # Cursor is taken from the last returned row, not from the extra one, so the tie on score is resolved by id
+    page = keys.page([*rows, {"id": 3, "_sort_score": 7, "_sort_id": 3}])
+    assert page.rows == rows
+    assert decode(page.next_cursor)["values"] == [7, 2]
+
+    assert keys.page(rows).next_cursor is None
+
+
+@pytest.mark.unit
+def test_invalid_cursor():
+    keys = paginator(SortKey("id", "t.id", int))
+
+    with pytest.raises(InvalidCursor):
+        keys.paginate(Query(), Parameters(), encode({"keys": ["score"], "values": [1]}))
+
+    with pytest.raises(InvalidCursor):
+        keys.paginate(Query(), Parameters(), encode({"keys": ["id"], "values": [["unknown", "1"]]}))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("values", [None, 5, {"score": 5}, [], [5], [5, 10, 15]])
+def test_cursor_with_wrong_values(values):
+    keys = paginator(SortKey("score", "t.score", int, descending=True), SortKey("id", "t.id", int))
+
+    with pytest.raises(InvalidCursor):
+        keys.paginate(Query(), Parameters(), encode({"keys": ["score", "id"], "values": values}))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["5", 10],
+        [5, True],
+        [5, [10, 11]],
+        [5, ["datetime", "2024-01-01T00:00:00"]],
+        [5, None],
+    ],
+)
+def test_cursor_with_wrong_value_types(values):
+    keys = paginator(SortKey("score", "t.score", int), SortKey("id", "t.id", int))
+
+    with pytest.raises(InvalidCursor):
+        keys.paginate(Query(), Parameters(), encode({"keys": ["score", "id"], "values": values}))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2024-01-01T00:00:00",
+        ["date", "2024-01-01"],
+        ["uuid", str(row_id)],
+        ["datetime", "not a date"],
+        ["datetime", 1704067200],
+        ["datetime", "2024-01-01T00:00:00", "extra"],
+    ],
+)
+def test_cursor_with_wrong_tagged_value(value):
+    keys = paginator(SortKey("created_at", "t.created_at", datetime.datetime))
+
+    with pytest.raises(InvalidCursor):
+        keys.paginate(Query(), Parameters(), encode({"keys": ["created_at"], "values": [value]}))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("score_descending", [False, True])
+def test_pages_cover_all_rows(score_descending):
+    # Scores repeat within and across pages, so only the id key tells the rows apart
+    rows = [(row_id, row_id % 3) for row_id in range(1, 12)]
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.execute("CREATE TABLE t (id int, score int)")
+    db.executemany("INSERT INTO t VALUES (?, ?)", rows)
+
+    keys = paginator(
+        SortKey("score", "t.score", int, descending=score_descending), SortKey("id", "t.id", int), page_size=3
+    )
+    seen, after = [], None
+    while True:
+        parameters = Parameters()
+        query = keys.paginate(Query().SELECT("t.id").FROM("t"), parameters, after)
+        # SQLite takes "$1" placeholders as named ones
+        result = db.execute(str(query), {str(i): value for i, value in enumerate(parameters, 1)}).fetchall()
+
+        page = keys.page([dict(row) for row in result])
+        seen.extend(row["id"] for row in page.rows)
+        if (after := page.next_cursor) is None:
+            break
+
+    expected = sorted(rows, key=lambda row: (-row[1] if score_descending else row[1], row[0]))
+    assert seen == [row_id for row_id, _ in expected]
@@ -0,0 +1,58 @@
+import asyncio
+
+import asyncpg
+import pytest
+from data.storage.postgres.pool import MeteredPool
+
+
+@pytest.fixture
+async def pool() -> MeteredPool:
+    return MeteredPool(
+        dsn="postgresql://localhost/test",
+        min_size=0,
+        max_size=1,
+        max_queries=1000,
+        max_inactive_connection_lifetime=0,
+        loop=None,
+        connection_class=asyncpg.Connection,
+        record_class=asyncpg.Record,
+    )
+
+
+@pytest.mark.unit
+async def test_acquire_metrics(pool, monkeypatch):
+    released = asyncio.Event()
+
+    async def acquire(self, timeout):
+        await released.wait()
+        return "connection"
+
+    monkeypatch.setattr(asyncpg.pool.Pool, "_acquire", acquire)
+
+    waiters = [asyncio.create_task(pool._acquire(None)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    assert (pool.stats().waiting, pool.stats().acquired) == (2, 0)
+
+    released.set()
+    assert await asyncio.gather(*waiters) == ["connection", "connection"]
+
+    stats = pool.stats()
+    assert (stats.waiting, stats.acquired) == (0, 2)
+    assert stats.max_acquire_time >= 0.01
+    assert stats.acquire_time >= 2 * 0.01
+
+
+@pytest.mark.unit
+async def test_failed_acquire_is_not_counted(pool, monkeypatch):
+    async def acquire(self, timeout):
+        await asyncio.sleep(0.01)
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncpg.pool.Pool, "_acquire", acquire)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool._acquire(0.01)
+
+    stats = pool.stats()
+    assert (stats.waiting, stats.acquired) == (0, 0)
+    assert stats.acquire_time >= 0.01
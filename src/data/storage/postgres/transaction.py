@@ -1,6 +1,7 @@
 import functools
 from contextvars import ContextVar
-from typing import Callable, TypeVar
+from datetime import timedelta
+from typing import Any, Callable, Mapping, TypeVar
 
 import asyncpg
 from data.storage.postgresql_database import PostgresDatabase
@@ -14,14 +15,50 @@ current_transaction: ContextVar[asyncpg.connection.Connection | None] = ContextV
 )
 
 
-def transaction(isolation: str = "read_committed") -> Callable[[_T], _T]:
+def transaction(isolation: str = "read_committed", **options: Any) -> Callable[[_T], _T]:
     def wrapper(func):
         @functools.wraps(func)
         async def wrapped(*args, **kwargs):
             pg = container.resolve(PostgresDatabase)
-            async with pg.transaction(isolation):
+            async with pg.transaction(isolation, **options):
                 return await func(*args, **kwargs)
 
         return wrapped
 
     return wrapper
+
+
+def timeout_settings(
+    statement_timeout: timedelta | None = None,
+    lock_timeout: timedelta | None = None,
+    idle_in_transaction_session_timeout: timedelta | None = None,
+) -> dict[str, str]:
+    timeouts = {
+        "statement_timeout": statement_timeout,
+        "lock_timeout": lock_timeout,
+        "idle_in_transaction_session_timeout": idle_in_transaction_session_timeout,
+    }
+    return {
+        name: f"{int(value / timedelta(milliseconds=1))}ms" for name, value in timeouts.items() if value is not None
+    }
+
+
+async def current_settings(connection: asyncpg.Connection, names: list[str]) -> dict[str, str]:
+    if not names:
+        return {}
+
+    rows = await connection.fetch("SELECT name, current_setting(name) FROM unnest($1::text[]) AS name", names)
+    return {row[0]: row[1] for row in rows}
+
+
+async def set_local_settings(connection: asyncpg.Connection, settings: Mapping[str, str]) -> None:
+    """
+    SET LOCAL can't take bind parameters, set_config(..., true) is the same thing that can.
+    Local settings last until the end of the top-level transaction, release of a savepoint keeps them.
+    """
+    if settings:
+        await connection.execute(
+            "SELECT set_config(name, value, true) FROM unnest($1::text[], $2::text[]) AS s(name, value)",
+            list(settings),
+            list(settings.values()),
+        )
@@ -1,35 +1,110 @@
 import abc
 from datetime import timedelta
-from typing import Any, AsyncContextManager, AsyncIterator, List, Mapping
+from typing import Any, AsyncContextManager, AsyncIterable, AsyncIterator, Iterable, List, Mapping
 
 import asyncpg
 from data.storage.database import Database
+from data.storage.postgres.compiled_query import CompiledQuery
 
 
 class PostgresDatabase(Database):
     @abc.abstractmethod
-    def transaction(self, isolation: str = "read_committed") -> AsyncContextManager: ...
+    def transaction(
+        self,
+        isolation: str = "read_committed",
+        read_only: bool = False,
+        deferrable: bool = False,
+        *,
+        use_replica: bool = False,
+        statement_timeout: timedelta | None = None,
+        lock_timeout: timedelta | None = None,
+        idle_in_transaction_session_timeout: timedelta | None = None,
+    ) -> AsyncContextManager:
+        """
+        Transaction runs on the primary. Read only one runs on a replica if there is one and use_replica is set,
+        so it must tolerate replication lag. Serializable transaction always runs on the primary.
+        Serializable read only deferrable transaction waits for a safe snapshot and never fails to serialize.
+        Nested transaction is a savepoint, its timeouts apply until it ends. It must have the same isolation
+        and read_only as the top-level one, and can be deferrable only if the top-level one is.
+        """
 
     @abc.abstractmethod
-    async def execute(self, query: str, *bindings, timeout: float | None = None): ...
+    async def execute(self, query: str | CompiledQuery, *bindings, timeout: float | None = None): ...
 
     @abc.abstractmethod
     async def executemany(self, query: str, bindings, *, timeout: float | None = None): ...
 
     @abc.abstractmethod
-    async def fetchrow(self, query: str, *bindings, timeout: float | None = None) -> Mapping | None: ...
+    async def fetchrow(
+        self, query: str | CompiledQuery, *bindings, timeout: float | None = None, use_primary: bool = False
+    ) -> Mapping | None: ...
 
     @abc.abstractmethod
-    async def fetch(self, query: str, *bindings, timeout: float | None = None) -> List[Mapping]: ...
+    async def fetch(
+        self, query: str | CompiledQuery, *bindings, timeout: float | None = None, use_primary: bool = False
+    ) -> List[Mapping]: ...
 
     @abc.abstractmethod
-    async def fetchval(self, query: str, *bindings, timeout: float | None = None) -> Any | None: ...
+    async def fetchval(
+        self, query: str | CompiledQuery, *bindings, timeout: float | None = None, use_primary: bool = False
+    ) -> Any | None: ...
 
     @abc.abstractmethod
-    async def cursor(self, query: str, *args, step: int = 500) -> AsyncIterator[asyncpg.Record]: ...
+    async def cursor(
+        self, query: str, *args, step: int = 500, prefetch: bool | None = None
+    ) -> AsyncIterator[asyncpg.Record]:
+        """
+        Streams rows with a server-side cursor, in the current transaction if there is one.
+        Next page is fetched in advance if prefetch is set, by default only outside of transactions.
+        Wrap it in contextlib.aclosing when stopping early, so the cursor is closed before the connection is used again.
+        """
 
     @abc.abstractmethod
-    async def lock(self, name: str) -> AsyncContextManager: ...
+    async def cursor_pages(
+        self, query: str, *args, step: int = 500, prefetch: bool | None = None
+    ) -> AsyncIterator[list[asyncpg.Record]]:
+        """Same as cursor but yields pages of up to step rows"""
 
     @abc.abstractmethod
-    async def xact_lock(self, name: str, timeout: timedelta | None = None) -> bool | None: ...
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        *,
+        records: Iterable[tuple] | AsyncIterable[tuple],
+        columns: list[str] | None = None,
+        schema_name: str | None = None,
+        timeout: float | None = None,
+    ) -> int:
+        """Streams records with COPY, in the current transaction if there is one. Returns the number of copied rows"""
+
+    @abc.abstractmethod
+    async def upsert_records(
+        self,
+        table_name: str,
+        *,
+        records: Iterable[tuple] | AsyncIterable[tuple],
+        columns: list[str],
+        conflict_columns: list[str],
+        update_columns: list[str] | None = None,
+        schema_name: str | None = None,
+        timeout: float | None = None,
+    ) -> int:
+        """
+        Inserts records updating the conflicting rows, all columns except conflict_columns are updated by default.
+        Returns the number of inserted and updated rows.
+        """
+
+    @abc.abstractmethod
+    def lock(self, name: str, timeout: timedelta | None = None) -> AsyncContextManager:
+        """
+        Advisory lock held on its own connection, outside of the current transaction.
+        Raises LockNotAcquired if it isn't taken within timeout.
+        """
+
+    @abc.abstractmethod
+    def try_lock(self, name: str, timeout: timedelta = timedelta(0)) -> AsyncContextManager[bool]:
+        """Same as lock, but yields whether the lock is taken instead of raising"""
+
+    @abc.abstractmethod
+    async def xact_lock(self, name: str, timeout: timedelta | None = None) -> bool:
+        """Advisory lock released at the end of the current transaction, returns False if not taken within timeout"""
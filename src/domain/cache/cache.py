@@ -1,16 +1,45 @@
 import abc
-from typing import Any
+from typing import Mapping
 
 
 class Cache(abc.ABC):
+    """Stores encoded values, see TypedCache for models"""
+
     @abc.abstractmethod
-    async def get(self, key: str) -> Any: ...
+    async def get(self, key: str) -> bytes | None: ...
 
     @abc.abstractmethod
-    async def set(self, key: str, value: Any, ttl: int) -> None: ...
+    async def set(self, key: str, value: bytes, ttl: int) -> None: ...
 
     @abc.abstractmethod
     async def delete(self, key: str) -> None: ...
 
     @abc.abstractmethod
-    async def clear(self): ...
+    async def get_with_ttl(self, key: str) -> tuple[bytes | None, float | None]:
+        """Returns value with its remaining ttl in seconds, (None, None) if key is missing"""
+
+    @abc.abstractmethod
+    async def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        """Returns values of found keys only"""
+
+    @abc.abstractmethod
+    async def set_many(self, items: Mapping[str, bytes], ttl: int) -> None: ...
+
+    @abc.abstractmethod
+    async def delete_many(self, keys: list[str]) -> None: ...
+
+    @abc.abstractmethod
+    async def lock(self, key: str, ttl: float) -> str | None:
+        """Takes a lock shared between processes, returns its token or None if the lock is already taken"""
+
+    @abc.abstractmethod
+    async def unlock(self, key: str, token: str) -> None:
+        """Releases the lock if it's still held with token"""
+
+    @abc.abstractmethod
+    async def incr(self, key: str) -> int:
+        """Increments an integer value without expiration, a missing key counts as 0"""
+
+    @abc.abstractmethod
+    async def clear(self, namespace: str | None = None):
+        """Deletes keys starting with "<namespace>:", or all keys if namespace isn't given"""
@@ -1,4 +1,5 @@
 import abc
+from typing import ClassVar
 
 from app.settings import settings
 from domain.environment.env import Env
@@ -6,6 +7,13 @@ from pydantic import BaseModel
 
 
 class CacheModel(BaseModel, abc.ABC):
+    # Bump on incompatible changes of the model, values stored by the previous version are ignored
+    cache_version: ClassVar[int] = 1
+
+    @classmethod
+    def cache_namespace(cls) -> str:
+        return f"{cls.__name__}:v{cls.cache_version}"
+
     @staticmethod
     def ttl():
         match settings.env:
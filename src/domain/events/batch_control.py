@@ -0,0 +1,23 @@
+from datetime import timedelta
+from typing import Sequence
+
+from domain.events.queue_control_interface import QueueControlInterface
+
+
+class BatchControl:
+    def __init__(self, controls: Sequence[QueueControlInterface]):
+        self._groups: dict[type[QueueControlInterface], list[QueueControlInterface]] = {}
+        for control in controls:
+            self._groups.setdefault(type(control), []).append(control)
+
+    async def ack(self):
+        for control_class, controls in self._groups.items():
+            await control_class.ack_many(controls)
+
+    async def retry(self):
+        for control_class, controls in self._groups.items():
+            await control_class.retry_many(controls)
+
+    async def delay(self, delay: timedelta):
+        for control_class, controls in self._groups.items():
+            await control_class.delay_many(controls, delay)
@@ -3,6 +3,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Callable
 
+from domain.events.batch_control import BatchControl
 from domain.events.controllable_event import ControllableEvent
 from domain.events.exceptions import RetryLater
 from domain.events.handler import EventHandler
@@ -12,20 +13,46 @@ from domain.events.models.event import Event
 class EventBatch:
     flush_task: asyncio.Task | None = None
 
-    def __init__(self, handler: EventHandler, logger: logging.Logger, events: list[ControllableEvent] = []):
+    def __init__(
+        self,
+        handler: EventHandler,
+        logger: logging.Logger,
+        events: list[ControllableEvent] = [],
+        on_flush: Callable[[], None] | None = None,
+    ):
         self.handler = handler
         self.logger = logger
-        self.batching_window = handler.batching_settings().window
+        self.on_flush = on_flush
+
+        batching_settings = handler.batching_settings()
+        self.batching_window = batching_settings.window
+        self.max_size = batching_settings.max_size
 
         self.events: list[ControllableEvent] = []
+        # Events taken by a running flush which are not acked yet
+        self.flushing_events: list[ControllableEvent] = []
         for event in events:
             self.add(event)
 
+    @property
+    def size(self) -> int:
+        return len(self.events) + len(self.flushing_events)
+
     def add(self, event: Event):
         self.events.append(event)
 
         if self.flush_task is None:
-            self.flush_task = self._schedule_flush(datetime.now() + self.batching_window)
+            self.flush_task = self._schedule_flush(self._next_flush_time(datetime.now()))
+        elif len(self.events) == self.max_size and not self.flushing_events:
+            # Batch is full before the window has passed, so it's flushed right away
+            self.flush_task.cancel()
+            self.flush_task = self._schedule_flush(datetime.now())
+
+    def _next_flush_time(self, since: datetime) -> datetime:
+        if len(self.events) >= self.max_size:
+            return since
+
+        return since + self.batching_window
 
     def _schedule_flush(self, time: datetime) -> asyncio.Task:
         async def func():
@@ -37,17 +64,18 @@ class EventBatch:
         return asyncio.create_task(func())
 
     async def _flush(self):
-        events = [*self.events]
-        self.events.clear()
+        # Oversized backlog is handled in chunks of max_size, the rest is flushed by the next run
+        events = self.flushing_events = self.events[: self.max_size]
+        del self.events[: self.max_size]
 
         now = datetime.now()
+        control = BatchControl([event.control for event in events])
 
         try:
             await self.handler.handle_batch(
                 [event.event for event in events],
             )
-            for event in events:
-                await event.control.ack()
+            await control.ack()
 
         except Exception as e:
             if isinstance(e, RetryLater):
@@ -57,8 +85,7 @@ class EventBatch:
                         "events": [event.event.model_dump(mode="json") for event in events],
                     },
                 )
-                for event in events:
-                    await event.control.delay(e.delay)
+                await control.delay(e.delay)
             else:
                 self.logger.error(
                     "Exception while handling event batch",
@@ -67,18 +94,24 @@ class EventBatch:
                         "error": e,
                     },
                 )
-                for event in events:
-                    await event.control.retry()
+                await control.retry()
+
+        self.flushing_events = []
 
         if len(self.events) > 0:
-            self.flush_task = self._schedule_flush(now + self.batching_window)
+            self.flush_task = self._schedule_flush(self._next_flush_time(now))
         else:
             self.flush_task = None
 
+        if self.on_flush is not None:
+            self.on_flush()
+
 
 class EventBatchRegistry:
-    def __init__(self) -> None:
+    def __init__(self, max_pending_events: int = 10000) -> None:
         self.batches: dict[str, EventBatch] = {}
+        self.max_pending_events = max_pending_events
+        self._flushed = asyncio.Event()
 
         self.cleanup_task = asyncio.create_task(
             self._cleanup_task(),
@@ -91,6 +124,19 @@ class EventBatchRegistry:
         batch = self.batches[key] = factory()
         return batch
 
+    @property
+    def pending_events(self) -> int:
+        return sum(batch.size for batch in self.batches.values())
+
+    async def wait_for_capacity(self) -> None:
+        """Blocks the consumer while too many events are buffered and not flushed yet"""
+        while self.pending_events >= self.max_pending_events:
+            self._flushed.clear()
+            await self._flushed.wait()
+
+    def notify_flushed(self) -> None:
+        self._flushed.set()
+
     async def _cleanup_task(self):
         while True:
             await asyncio.sleep(1)
@@ -101,9 +147,9 @@ class EventBatchRegistry:
 
 
 class EventBatchProcessor:
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, max_pending_events: int = 10000):
         self.logger = logger
-        self.batches = EventBatchRegistry()
+        self.batches = EventBatchRegistry(max_pending_events)
 
     async def handle(self, handler: EventHandler, event: ControllableEvent):
         batch_id = handler.batch_id(event.event)
@@ -112,9 +158,12 @@ class EventBatchProcessor:
             await self._handle_immediate(handler, event)
             return
 
+        await self.batches.wait_for_capacity()
+
         batch = self.batches.get(
-            f"{id(handler)}:{batch_id}",
-            lambda: EventBatch(handler, self.logger),
+            # Transient handlers are created per event, so the batch is shared by handler class
+            f"{type(handler).__module__}.{type(handler).__qualname__}:{batch_id}",
+            lambda: EventBatch(handler, self.logger, on_flush=self.batches.notify_flushed),
         )
         batch.add(event)
 
@@ -7,7 +7,10 @@ from domain.events.processable_event import ProcessableEvent
 
 class EventBroker(abc.ABC):
     @abc.abstractmethod
-    async def listen(self, queue_name: str) -> AsyncIterator[ProcessableEvent]: ...
+    async def listen(self, queue_name: str, prefetch_count: int | None = None) -> AsyncIterator[ProcessableEvent]: ...
 
     @abc.abstractmethod
     async def publish(self, queue_name: str, message: dict, delay: timedelta = timedelta()) -> None: ...
+
+    @abc.abstractmethod
+    async def publish_many(self, queue_name: str, messages: list[dict], delay: timedelta = timedelta()) -> None: ...
@@ -5,5 +5,5 @@ from domain.events.queue_control_interface import QueueControlInterface
 
 @dataclass
 class ControllableMessage:
-    data: dict
+    body: bytes
     control: QueueControlInterface
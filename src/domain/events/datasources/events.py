@@ -1,4 +1,5 @@
 import abc
+from datetime import datetime
 from typing import AsyncGenerator, AsyncIterator
 
 from domain.events.models.event_record import EventRecord
@@ -11,6 +12,13 @@ class EventsDatasource(abc.ABC):
         event: EventRecord,
     ) -> EventRecord | None: ...
 
+    @abc.abstractmethod
+    async def save_many(
+        self,
+        events: list[EventRecord],
+    ) -> set[str]:
+        """Inserts records skipping already existing ones, returns ids of inserted records"""
+
     @abc.abstractmethod
     async def get_by_id(self, id: str) -> EventRecord | None: ...
 
@@ -29,3 +37,16 @@ class EventsDatasource(abc.ABC):
         self,
         event_id: str,
     ) -> None: ...
+
+    @abc.abstractmethod
+    async def mark_processed_many(
+        self,
+        event_ids: list[str],
+        processed_at: datetime,
+    ) -> None: ...
+
+    @abc.abstractmethod
+    async def delete_many(
+        self,
+        event_ids: list[str],
+    ) -> None: ...
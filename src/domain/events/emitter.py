@@ -20,3 +20,14 @@ class EventEmitter(Generic[TEventData]):  # type: ignore
         )
 
         await self.event_broker.publish(self.queue_name, event.model_dump(mode="json"), delay)
+
+    async def emit_many(self, events: list[Event[TEventData]], delay: timedelta = timedelta()) -> None:
+        if not events:
+            return
+
+        self.logger.info(
+            "Emitting events",
+            extra={"events": [event.id for event in events], "queue": self.queue_name},
+        )
+
+        await self.event_broker.publish_many(self.queue_name, [event.model_dump(mode="json") for event in events], delay)
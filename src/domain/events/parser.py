@@ -4,8 +4,8 @@ import di
 from domain.events.controllable_event import ControllableEvent
 from domain.events.controllable_message import ControllableMessage
 from domain.events.exceptions import UnrecognizedEvent
-from domain.events.models.event import Event
 from domain.events.registry import EventHandlerRegistry
+from pydantic import ValidationError
 
 
 class EventParser:
@@ -14,23 +14,28 @@ class EventParser:
         self.logger = di.resolve(logging.Logger)()
 
     def parse(self, message: ControllableMessage) -> ControllableEvent:
-        data = message.data
-        event_type = self.registry.get_event(data["event"])
+        events_adapter = self.registry.events_adapter
 
-        if event_type is None:
-            self.logger.error("No handler for event type", extra={"data": data})
+        if events_adapter is None:
+            self.logger.error("No handler for event type", extra={"message_body": message.body})
             raise UnrecognizedEvent
 
         try:
             return ControllableEvent(
-                event=Event(
-                    id=data["id"],
-                    event=data["event"],
-                    timestamp=data["timestamp"],
-                    data=event_type(**data["data"]),
-                ),
+                event=events_adapter.validate_json(message.body),
                 control=message.control,
             )
-        except Exception as e:
-            self.logger.error("Event validation failed", extra={"data": data, "error": e})
+        except ValidationError as e:
+            if self._is_unrecognized(e):
+                self.logger.error("No handler for event type", extra={"message_body": message.body})
+                raise UnrecognizedEvent
+
+            self.logger.error("Event validation failed", extra={"message_body": message.body, "error": e})
             raise
+
+    def _is_unrecognized(self, error: ValidationError) -> bool:
+        # Unknown event name fails the union discriminator, or the literal when only one event is registered
+        return any(
+            item["type"] == "union_tag_invalid" or (item["type"] == "literal_error" and item["loc"] == ("event",))
+            for item in error.errors()
+        )
@@ -18,7 +18,7 @@ class ProcessableEvent:
         except Exception as e:
             self.logger.error(
                 "Exception while processing message",
-                extra={"message_data": self.message.data, "error": e},
+                extra={"message_body": self.message.body, "error": e},
             )
 
             await self.message.control.retry()
@@ -1,5 +1,6 @@
 import abc
 from datetime import timedelta
+from typing import Sequence
 
 
 class QueueControlInterface(abc.ABC):
@@ -11,3 +12,21 @@ class QueueControlInterface(abc.ABC):
 
     @abc.abstractmethod
     async def delay(self, delay: timedelta): ...
+
+    # Batch counterparts receive controls of the same class only (see BatchControl),
+    # so implementations can override them with bulk broker operations
+
+    @classmethod
+    async def ack_many(cls, controls: Sequence["QueueControlInterface"]):
+        for control in controls:
+            await control.ack()
+
+    @classmethod
+    async def retry_many(cls, controls: Sequence["QueueControlInterface"]):
+        for control in controls:
+            await control.retry()
+
+    @classmethod
+    async def delay_many(cls, controls: Sequence["QueueControlInterface"], delay: timedelta):
+        for control in controls:
+            await control.delay(delay)
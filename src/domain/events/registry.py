@@ -1,6 +1,8 @@
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Type, get_args
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Annotated, Callable, List, Literal, Mapping, Type, Union, get_args
 
 import di
 from domain.events.batch_processor import EventBatchProcessor
@@ -12,17 +14,36 @@ from domain.events.models.base import EventPayload
 from domain.events.models.event import Event, TEventData
 from domain.events.models.event_handler_registry_item import EventHandlerRegistryItem
 from domain.events.models.event_record import EventRecord
+from pydantic import Field, TypeAdapter, create_model
 
 
 class EventHandlerRegistry:
-    def __init__(self, event_handlers):
+    def __init__(
+        self,
+        event_handlers,
+        *,
+        route_batch_window: timedelta = timedelta(milliseconds=50),
+        route_batch_size: int = 500,
+    ):
         self.handlers = dict()
         self.events = dict()
+        # Event name -> event model with the name fixed as literal, so one discriminated union
+        # adapter validates any registered event straight from the message body
+        self.event_models: dict[str, Type[Event]] = dict()
+        self.events_adapter: TypeAdapter[Event] | None = None
+        # Routing table: event name -> handler factories, rebuilt on register
+        self.routes: Mapping[str, tuple[Callable[[], EventHandler], ...]] = MappingProxyType({})
+        self._handler_factories: dict[Type[EventHandler], Callable[[], EventHandler]] = {}
         self.events_ds = di.resolve(EventsDatasource)()
         self.register(event_handlers)
         self.logger = di.resolve(logging.Logger)()
         self.processor = EventBatchProcessor(self.logger)
 
+        self.route_batch_window = route_batch_window
+        self.route_batch_size = route_batch_size
+        self._pending_routes: list[tuple[ControllableEvent, asyncio.Future]] = []
+        self._routes_flush_task: asyncio.Task | None = None
+
     def register(self, handlers: List[Type[EventHandler]]):
         for handler in handlers:
             payload_class: Type[EventPayload] = get_args(handler.__orig_bases__[0])[0]
@@ -36,12 +57,20 @@ class EventHandlerRegistry:
                     """)
             else:
                 self.events[event_name] = payload_class
+                self.event_models[event_name] = create_model(
+                    f"{payload_class.__name__}Event",
+                    __base__=Event[payload_class],  # type: ignore
+                    event=(Literal[event_name], ...),
+                )
 
             if event_name not in self.handlers:
                 self.handlers[event_name] = []
 
             self.handlers[event_name].append(EventHandlerRegistryItem(handler=handler, event_model=payload_class))
 
+        self._build_routes()
+        self._build_events_adapter()
+
     def get_event(self, event: str) -> TEventData | None:
         return self.events.get(event)
 
@@ -59,12 +88,62 @@ class EventHandlerRegistry:
                 await c_event.control.ack()
                 return
 
-            for config in self.handlers.get(event.event, []):
-                handler: EventHandler = di.resolve(config.handler)()
-                await self.processor.handle(handler, c_event)
+            await self._handle(c_event)
 
             event_record.processed_at = datetime.now()
 
+    async def route_batched(self, c_event: ControllableEvent):
+        """Same as route, but deduplication and bookkeeping are done for all events routed within a short window"""
+        routed = asyncio.get_running_loop().create_future()
+        self._pending_routes.append((c_event, routed))
+
+        if len(self._pending_routes) >= self.route_batch_size:
+            self._schedule_routes_flush(timedelta())
+        elif self._routes_flush_task is None:
+            self._schedule_routes_flush(self.route_batch_window)
+
+        await routed
+
+    async def route_many(self, c_events: list[ControllableEvent]):
+        received_at = datetime.now()
+        records = [
+            EventRecord(**c_event.event.model_dump(), received_at=received_at, sent_at=c_event.event.timestamp)
+            for c_event in c_events
+        ]
+        saved_ids = set(await self.events_ds.save_many(records))
+
+        handled: list[ControllableEvent] = []
+        for c_event in c_events:
+            event = c_event.event
+
+            if event.id not in saved_ids:
+                self.logger.warning("Event was already processed", extra={"event": event.model_dump()})
+                await c_event.control.ack()
+                continue
+
+            # The same event may be delivered twice within one batch
+            saved_ids.discard(event.id)
+            handled.append(c_event)
+
+        # Events of the batch come from concurrent consumers, so one slow handler must not hold up the others
+        results = await asyncio.gather(*[self._handle(c_event) for c_event in handled], return_exceptions=True)
+
+        processed_ids: list[str] = []
+        failed_ids: list[str] = []
+        for c_event, result in zip(handled, results):
+            if isinstance(result, BaseException):
+                failed_ids.append(c_event.event.id)
+            else:
+                processed_ids.append(c_event.event.id)
+
+        if processed_ids:
+            await self.events_ds.mark_processed_many(processed_ids, datetime.now())
+
+        # Failed event is already logged and retried by the processor. Its record is deleted, so the redelivery
+        # is saved and handled again, while a duplicate of an event still being handled is skipped by save_many
+        if failed_ids:
+            await self.events_ds.delete_many(failed_ids)
+
     async def route_task(self, c_event: ControllableEvent):
         event = c_event.event
 
@@ -73,9 +152,65 @@ class EventHandlerRegistry:
             extra={"event": event.model_dump(mode="json")},
         )
 
-        for config in self.handlers.get(event.event, []):
-            handler: EventHandler = di.resolve(config.handler)()
-            await self.processor.handle(handler, c_event)
+        await self._handle(c_event)
+
+    async def _handle(self, c_event: ControllableEvent):
+        for handler_factory in self.routes.get(c_event.event.event, ()):
+            await self.processor.handle(handler_factory(), c_event)
+
+    def _build_routes(self):
+        # Factories are looked up once, handlers are created per event in their DI scope,
+        # so a transient handler's state isn't shared between events
+        for items in self.handlers.values():
+            for config in items:
+                if config.handler not in self._handler_factories:
+                    self._handler_factories[config.handler] = di.resolve(config.handler)
+
+        self.routes = MappingProxyType(
+            {
+                event_name: tuple(self._handler_factories[config.handler] for config in items)
+                for event_name, items in self.handlers.items()
+            }
+        )
+
+    def _build_events_adapter(self):
+        models = tuple(self.event_models.values())
+
+        if len(models) > 1:
+            self.events_adapter = TypeAdapter(Annotated[Union[models], Field(discriminator="event")])
+        elif models:
+            self.events_adapter = TypeAdapter(models[0])
+
+    def _schedule_routes_flush(self, delay: timedelta):
+        # Only a flush which is still waiting can be cancelled, a running one has already taken its routes
+        if self._routes_flush_task is not None:
+            self._routes_flush_task.cancel()
+
+        async def func():
+            if delay > timedelta():
+                await asyncio.sleep(delay.total_seconds())
+
+            routes = self._pending_routes[: self.route_batch_size]
+            del self._pending_routes[: self.route_batch_size]
+            self._routes_flush_task = None
+
+            if len(self._pending_routes) >= self.route_batch_size:
+                self._schedule_routes_flush(timedelta())
+            elif self._pending_routes:
+                self._schedule_routes_flush(self.route_batch_window)
+
+            try:
+                await self.route_many([c_event for c_event, _ in routes])
+            except Exception as e:
+                for _, routed in routes:
+                    if not routed.done():
+                        routed.set_exception(e)
+            else:
+                for _, routed in routes:
+                    if not routed.done():
+                        routed.set_result(None)
+
+        self._routes_flush_task = asyncio.create_task(func())
 
     async def _is_event_processed(self, event: Event) -> bool:
         record = EventRecord(**event.model_dump(), received_at=datetime.now(), sent_at=event.timestamp)
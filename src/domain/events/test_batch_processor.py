@@ -128,6 +128,58 @@ async def test_batch_flush_new_events_while_flushing(events, monkeypatch):
     assert batch.flush_task is None
 
 
+def make_events(count: int) -> list[ControllableEvent]:
+    return [
+        ControllableEvent(
+            Event[TestTask](id=str(i), event="test", data=TestTask(value=str(i)), timestamp=ts),
+            TestQueueControlInterface(),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.unit
+async def test_batch_flush_max_size():
+    handler = TestEventHandler(max_size=2)
+    events = make_events(5)
+    batch = EventBatch(handler, mock.Mock(), events)
+
+    await asyncio.sleep(0.01)
+
+    # Full chunks are flushed without waiting for the window
+    assert handler.received_batch_sizes == [2, 2]
+    assert batch.events == [events[4]]
+    assert all(event.control.status == "acked" for event in events[:4])
+
+    await asyncio.sleep(0.15)
+
+    assert handler.received_batch_sizes == [2, 2, 1]
+    assert handler.received_events == [event.event for event in events]
+    assert events[4].control.status == "acked"
+    assert batch.flush_task is None
+
+
+@pytest.mark.unit
+async def test_processor_burst():
+    handler = TestEventHandler(batch_id="test", max_size=50)
+    processor = EventBatchProcessor(mock.Mock(), max_pending_events=100)
+    events = make_events(5000)
+
+    peak_pending_events = 0
+    for event in events:
+        await processor.handle(handler, event)
+        peak_pending_events = max(peak_pending_events, processor.batches.pending_events)
+
+    await asyncio.sleep(0.15)
+
+    # Consumer is held back instead of buffering the whole burst
+    assert peak_pending_events == 100
+    assert handler.received_batch_sizes == [50] * 100
+    assert handler.received_events == [event.event for event in events]
+    assert all(event.control.status == "acked" for event in events)
+    assert processor.batches.pending_events == 0
+
+
 @pytest.mark.unit
 async def test_batch_registry():
     handler = TestEventHandler()
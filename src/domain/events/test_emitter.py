@@ -0,0 +1,37 @@
+import datetime
+
+import pytest
+from domain.events.emitter import EventEmitter
+from domain.events.models.event import Event
+from tests.rabbitmq_test_impl import TestRabbitMQEventBroker
+from tests.task import TestTask
+
+ts = datetime.datetime.now().timestamp()
+
+
+@pytest.mark.unit
+async def test_emit_many():
+    broker = TestRabbitMQEventBroker()
+    emitter = EventEmitter(broker, "queue")
+
+    events = [Event[TestTask](id=str(i), event="test", data=TestTask(value=str(i)), timestamp=ts) for i in range(3)]
+    await emitter.emit_many(events, datetime.timedelta(seconds=1))
+
+    assert broker.published_messages() == [
+        {
+            "queue_name": "queue",
+            "message": event.model_dump(mode="json"),
+            "delay": datetime.timedelta(seconds=1),
+        }
+        for event in events
+    ]
+
+
+@pytest.mark.unit
+async def test_emit_many_empty():
+    broker = TestRabbitMQEventBroker()
+    emitter = EventEmitter(broker, "queue")
+
+    await emitter.emit_many([])
+
+    assert broker.published_messages() == []
@@ -0,0 +1,88 @@
+import logging
+from unittest import mock
+
+import orjson
+import pytest
+from domain.events.controllable_message import ControllableMessage
+from domain.events.datasources.events import EventsDatasource
+from domain.events.exceptions import UnrecognizedEvent
+from domain.events.handler import EventHandler
+from domain.events.models.event import Event
+from domain.events.parser import EventParser
+from domain.events.registry import EventHandlerRegistry
+from pydantic import ValidationError
+from tests.events_datasource_test_impl import TestEventsDatasource
+from tests.rabbitmq_test_impl import TestQueueControlInterface
+from tests.task import TestTask
+
+
+class TestTaskHandler(EventHandler[TestTask]):
+    __test__ = False
+
+    async def handle(self, event: Event[TestTask]):
+        pass
+
+
+@pytest.fixture
+async def parser(di) -> EventParser:
+    di.register(EventsDatasource, instance=TestEventsDatasource())
+    di.register(TestTaskHandler, instance=TestTaskHandler())
+    di.register(logging.Logger, instance=mock.Mock())
+    return EventParser(EventHandlerRegistry([TestTaskHandler]))
+
+
+def make_message(**data) -> ControllableMessage:
+    return ControllableMessage(orjson.dumps(data), TestQueueControlInterface())
+
+
+@pytest.mark.unit
+async def test_parse(parser):
+    message = make_message(id="1", event=TestTask.__event_name__, data={"value": "1"}, timestamp=1.5, rollback=True)
+    c_event = parser.parse(message)
+
+    assert isinstance(c_event.event, Event[TestTask])
+    assert c_event.event.model_dump() == {
+        "id": "1",
+        "event": TestTask.__event_name__,
+        "data": {"value": "1"},
+        "timestamp": 1.5,
+        "rollback": True,
+    }
+    assert c_event.control is message.control
+
+
+@pytest.mark.unit
+async def test_parse_unrecognized_event(parser):
+    with pytest.raises(UnrecognizedEvent):
+        parser.parse(make_message(id="1", event="unknown", data={}, timestamp=1.5))
+
+
+@pytest.mark.unit
+async def test_parse_invalid(parser):
+    with pytest.raises(ValidationError):
+        parser.parse(make_message(id="1", event=TestTask.__event_name__, data={}, timestamp=1.5))
+
+    with pytest.raises(ValidationError):
+        parser.parse(ControllableMessage(b"not json", TestQueueControlInterface()))
+
+
+@pytest.mark.unit
+async def test_parse_multiple_events(di, parser):
+    class OtherTask(TestTask):
+        __event_name__ = "other_task"
+
+    class OtherTaskHandler(EventHandler[OtherTask]):
+        async def handle(self, event: Event[OtherTask]):
+            pass
+
+    di.register(OtherTaskHandler, instance=OtherTaskHandler())
+    parser.registry.register([OtherTaskHandler])
+
+    c_event = parser.parse(make_message(id="1", event="other_task", data={"value": "1"}, timestamp=1.5))
+    assert isinstance(c_event.event.data, OtherTask)
+
+    c_event = parser.parse(make_message(id="2", event=TestTask.__event_name__, data={"value": "2"}, timestamp=1.5))
+    assert type(c_event.event.data) is TestTask
+
+    with pytest.raises(UnrecognizedEvent):
+        parser.parse(make_message(id="3", event="unknown", data={}, timestamp=1.5))
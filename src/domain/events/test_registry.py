@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+import logging
+from unittest import mock
+
+import pytest
+from domain.errors.base_exceptions import UnexpectedError
+from domain.events.controllable_event import ControllableEvent
+from domain.events.datasources.events import EventsDatasource
+from domain.events.handler import EventHandler
+from domain.events.models.event import Event
+from domain.events.models.event_record import EventRecord
+from domain.events.registry import EventHandlerRegistry
+from tests.events_datasource_test_impl import TestEventsDatasource
+from tests.rabbitmq_test_impl import TestQueueControlInterface
+from tests.task import TestTask
+
+ts = datetime.datetime.now().timestamp()
+
+
+class TestTaskHandler(EventHandler[TestTask]):
+    __test__ = False
+
+    def __init__(self) -> None:
+        self.received_events: list[Event] = []
+        self.released = asyncio.Event()
+
+    async def handle(self, event: Event[TestTask]):
+        self.received_events.append(event)
+
+        if event.data.value == "fail":
+            raise UnexpectedError
+        if event.data.value == "wait":
+            await self.released.wait()
+        if event.data.value == "release":
+            self.released.set()
+
+
+@pytest.fixture
+def events_ds(di) -> TestEventsDatasource:
+    events_ds = TestEventsDatasource()
+    di.register(EventsDatasource, instance=events_ds)
+    return events_ds
+
+
+@pytest.fixture
+def handler(di) -> TestTaskHandler:
+    handler = TestTaskHandler()
+    di.register(TestTaskHandler, instance=handler)
+    di.register(logging.Logger, instance=mock.Mock())
+    return handler
+
+
+def make_event(id: str, value: str = "") -> ControllableEvent:
+    return ControllableEvent(
+        Event[TestTask](id=id, event=TestTask.__event_name__, data=TestTask(value=value), timestamp=ts),
+        TestQueueControlInterface(),
+    )
+
+
+@pytest.mark.unit
+async def test_route_many(events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler])
+    now = datetime.datetime.now()
+    await events_ds.save_many([EventRecord(**make_event("1").event.model_dump(), received_at=now, processed_at=now)])
+
+    events = [make_event("1"), make_event("2"), make_event("2"), make_event("3", "fail")]
+    events_ds.queries.clear()
+    await registry.route_many(events)
+
+    assert events_ds.queries == ["save_many", "mark_processed_many", "delete_many"]
+    assert [event.id for event in handler.received_events] == ["2", "3"]
+    assert [event.control.status for event in events] == ["acked", "acked", "acked", "retried"]
+    assert events_ds.records["2"].processed_at is not None
+    # Record of the failed event is deleted, so its redelivery is handled again
+    assert "3" not in events_ds.records
+
+
+@pytest.mark.unit
+async def test_route_many_handles_redelivered_failed_event(events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler])
+
+    failed = make_event("1", "fail")
+    await registry.route_many([failed])
+    assert failed.control.status == "retried"
+
+    redelivered = make_event("1")
+    await registry.route_many([redelivered])
+
+    assert [event.id for event in handler.received_events] == ["1", "1"]
+    assert redelivered.control.status == "acked"
+    assert events_ds.records["1"].processed_at is not None
+
+
+@pytest.mark.unit
+async def test_route_many_skips_duplicate_of_event_in_progress(events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler])
+
+    first = asyncio.create_task(registry.route_many([make_event("1", "wait")]))
+    await asyncio.sleep(0.01)
+    duplicate = make_event("1", "wait")
+    await registry.route_many([duplicate])
+
+    # Duplicate is acked without being handled while the first delivery is still in progress
+    assert duplicate.control.status == "acked"
+    assert len(handler.received_events) == 1
+
+    handler.released.set()
+    await first
+    assert events_ds.records["1"].processed_at is not None
+
+
+@pytest.mark.unit
+async def test_route_many_handles_events_concurrently(events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler])
+    events = [make_event("1", "wait"), make_event("2", "release")]
+
+    # Handled one by one, the first event would wait forever for the second one
+    await asyncio.wait_for(registry.route_many(events), timeout=1)
+
+    assert [event.control.status for event in events] == ["acked", "acked"]
+    assert all(record.processed_at is not None for record in events_ds.records.values())
+
+
+@pytest.mark.unit
+async def test_route_batched(events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler], route_batch_size=3)
+    events = [make_event(str(i)) for i in range(5)]
+
+    await asyncio.gather(*[registry.route_batched(event) for event in events])
+
+    assert events_ds.queries == ["save_many", "mark_processed_many"] * 2
+    assert [event.id for event in handler.received_events] == ["0", "1", "2", "3", "4"]
+    assert all(event.control.status == "acked" for event in events)
+    assert all(record.processed_at is not None for record in events_ds.records.values())
+
+
+class TransientTaskHandler(EventHandler[TestTask]):
+    __test__ = False
+
+    instances: list["TransientTaskHandler"] = []
+
+    def __init__(self) -> None:
+        self.instances.append(self)
+        self.received_events: list[Event] = []
+
+    async def handle(self, event: Event[TestTask]):
+        self.received_events.append(event)
+
+    async def handle_batch(self, events: list[Event[TestTask]]):
+        self.received_events.extend(events)
+
+    def batch_id(self, event: Event[TestTask]) -> str | None:
+        return "batch" if event.data.value == "batch" else None
+
+
+@pytest.fixture
+def transient_handler(di, events_ds):
+    di.register(TransientTaskHandler)
+    di.register(logging.Logger, instance=mock.Mock())
+    TransientTaskHandler.instances.clear()
+    return TransientTaskHandler
+
+
+@pytest.mark.unit
+async def test_singleton_handler_is_reused(di, events_ds, handler):
+    registry = EventHandlerRegistry([TestTaskHandler])
+
+    await registry.route_task(make_event("1"))
+    await registry.route_task(make_event("2"))
+
+    assert [event.id for event in handler.received_events] == ["1", "2"]
+
+
+@pytest.mark.unit
+async def test_transient_handler_is_created_per_event(transient_handler):
+    registry = EventHandlerRegistry([TransientTaskHandler])
+
+    await registry.route_task(make_event("1"))
+    await registry.route_task(make_event("2"))
+
+    # Registration is done once, the handler state isn't shared between events
+    assert [[event.id for event in handler.received_events] for handler in transient_handler.instances] == [
+        ["1"],
+        ["2"],
+    ]
+
+
+@pytest.mark.unit
+async def test_transient_handler_events_share_batch(transient_handler):
+    registry = EventHandlerRegistry([TransientTaskHandler])
+
+    await registry.route_task(make_event("1", "batch"))
+    await registry.route_task(make_event("2", "batch"))
+
+    batches = registry.processor.batches.batches
+    assert len(batches) == 1
+    assert [event.event.id for event in next(iter(batches.values())).events] == ["1", "2"]
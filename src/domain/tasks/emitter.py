@@ -21,13 +21,22 @@ class TaskEmitter(Generic[TPayload]):
         rollback: bool = False,
         delay: datetime.timedelta = datetime.timedelta(),
     ) -> None:
-        await self.emitter.emit(
-            Event(
-                id=str(uuid4()),
-                event=task.__event_name__,
-                data=task,
-                timestamp=datetime.datetime.now().timestamp(),
-                rollback=rollback,
-            ),
-            delay,
+        await self.emitter.emit(self._event(task, rollback), delay)
+
+    async def emit_many(
+        self,
+        tasks: list[TPayload],
+        rollback: bool = False,
+        delay: datetime.timedelta = datetime.timedelta(),
+    ) -> None:
+        await self.emitter.emit_many([self._event(task, rollback) for task in tasks], delay)
+
+    @staticmethod
+    def _event(task: TPayload, rollback: bool) -> Event[TPayload]:
+        return Event(
+            id=str(uuid4()),
+            event=task.__event_name__,
+            data=task,
+            timestamp=datetime.datetime.now().timestamp(),
+            rollback=rollback,
         )
@@ -0,0 +1,274 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+import asyncpg
+from data.storage.postgres.pool import PoolStats
+
+
+class TestTransaction:
+    """asyncpg transaction, nested one is a savepoint which reverts local settings on rollback"""
+
+    __test__ = False
+
+    def __init__(self, connection: "TestConnection", isolation: str | None, readonly: bool, deferrable: bool):
+        self.connection = connection
+        self._isolation = isolation
+        self._readonly = readonly
+        self._deferrable = deferrable
+        self._settings: dict[str, str] = {}
+
+    async def __aenter__(self):
+        connection = self.connection
+        self._settings = dict(connection.settings)
+
+        if connection._top_xact is None:
+            connection._top_xact = self
+            connection.log.append("BEGIN")
+        else:
+            connection.log.append("SAVEPOINT")
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        connection = self.connection
+        connection.check_idle()
+        top_level = connection._top_xact is self
+
+        if exc_type is None:
+            connection.log.append("COMMIT" if top_level else "RELEASE SAVEPOINT")
+        else:
+            connection.log.append("ROLLBACK" if top_level else "ROLLBACK TO SAVEPOINT")
+            connection.settings = self._settings
+
+        if top_level:
+            connection._top_xact = None
+            connection.settings = dict(connection.session_settings)
+            connection.xact_locks.clear()
+
+
+class TestCursor:
+    __test__ = False
+
+    def __init__(self, connection: "TestConnection", rows: list[Any]):
+        self.connection = connection
+        self.rows = rows
+
+    async def fetch(self, n: int) -> list[Any]:
+        self.connection._run(f"FETCH {n}")
+
+        # Page arrives from the server later, so a prefetch can still be in flight
+        self.connection.busy = True
+        try:
+            await asyncio.sleep(0)
+        finally:
+            self.connection.busy = False
+
+        rows, self.rows = self.rows[:n], self.rows[n:]
+        return rows
+
+
+class TestPreparedStatement:
+    """Same constructor as asyncpg PreparedStatement, which is made anew for every run on the state of the first one"""
+
+    __test__ = False
+
+    def __init__(self, connection: "TestConnection", query: str, state: object):
+        self.connection = connection
+        self.query = query
+        self._state = state
+
+    async def fetch(self, *args, timeout: float | None = None) -> list[Any]:
+        self.connection._run(f"EXECUTE {self.query}")
+        return self.connection.results.get("fetch", [])
+
+    async def fetchrow(self, *args, timeout: float | None = None) -> Any:
+        self.connection._run(f"EXECUTE {self.query}")
+        return self.connection.results.get("fetchrow")
+
+    async def fetchval(self, *args, timeout: float | None = None) -> Any:
+        self.connection._run(f"EXECUTE {self.query}")
+        return self.connection.results.get("fetchval")
+
+    def get_statusmsg(self) -> str:
+        return self.connection.results.get("execute", "SELECT 1")
+
+
+class TestConnection:
+    """
+    Fake asyncpg connection which records statements in log.
+    Results of fetch methods are set with results, set_config and current_setting queries work on settings.
+    Advisory locks in held_by_others can't be taken, ones taken by the connection are kept in locks and xact_locks.
+    """
+
+    __test__ = False
+
+    def __init__(self, name: str = "primary"):
+        self.name = name
+        self.log: list[str] = []
+        self.results: dict[str, Any] = {}
+        self.cursor_rows: list[Any] = []
+        self.copied: dict[str, list[tuple]] = {}
+        self.session_settings = {"statement_timeout": "0", "lock_timeout": "0"}
+        self.settings = dict(self.session_settings)
+        self.error: BaseException | None = None
+        self.busy = False
+        self._top_xact: TestTransaction | None = None
+        self.held_by_others: set[int] = set()
+        self.locks: list[int] = []
+        self.xact_locks: list[int] = []
+        self.termination_listeners: list[Callable[["TestConnection"], None]] = []
+        # Pool connection proxy exposes the underlying connection as _con
+        self._con = self
+
+    async def prepare(self, query: str) -> TestPreparedStatement:
+        self._run(f"PREPARE {query}")
+        return TestPreparedStatement(self, query, object())
+
+    def add_termination_listener(self, callback: Callable[["TestConnection"], None]) -> None:
+        self.termination_listeners.append(callback)
+
+    async def close(self) -> None:
+        for callback in self.termination_listeners:
+            callback(self)
+
+    def transaction(self, isolation: str | None = None, readonly: bool = False, deferrable: bool = False):
+        return TestTransaction(self, isolation, readonly, deferrable)
+
+    async def execute(self, query: str, *args, timeout: float | None = None) -> str:
+        self._run(query)
+
+        if "set_config" in query and isinstance(args[0], list):
+            names, values = args
+            self.settings.update(zip(names, values))
+        elif match := re.search(r"set_config\('(\w+)', \$1, (true|false)\)", query):
+            name, local = match.groups()
+            self.settings[name] = args[0]
+            if local == "false":
+                self.session_settings[name] = args[0]
+        elif match := re.search(r"pg_advisory(_xact)?_lock\(", query):
+            self._lock(args[0], xact=bool(match.group(1)))
+        elif "pg_advisory_unlock" in query:
+            self.locks.remove(args[0])
+
+        return self.results.get("execute", "SELECT 1")
+
+    async def executemany(self, query: str, args, *, timeout: float | None = None):
+        self._run(query)
+
+    async def fetch(self, query: str, *args, timeout: float | None = None) -> list[Any]:
+        self._run(query)
+
+        if "current_setting" in query:
+            return [(name, self.settings[name]) for name in args[0]]
+
+        return self.results.get("fetch", [])
+
+    async def fetchrow(self, query: str, *args, timeout: float | None = None) -> Any:
+        self._run(query)
+        return self.results.get("fetchrow")
+
+    async def fetchval(self, query: str, *args, timeout: float | None = None) -> Any:
+        self._run(query)
+
+        if match := re.search(r"current_setting\('(\w+)'\)", query):
+            return self.settings[match.group(1)]
+        if match := re.search(r"pg_try_advisory(_xact)?_lock\(", query):
+            if args[0] in self.held_by_others:
+                return False
+            self._lock(args[0], xact=bool(match.group(1)))
+            return True
+
+        return self.results.get("fetchval")
+
+    async def cursor(self, query: str, *args) -> TestCursor:
+        self._run(query)
+        return TestCursor(self, list(self.cursor_rows))
+
+    async def copy_records_to_table(self, table_name: str, *, records, columns=None, schema_name=None, timeout=None):
+        self.log.append(f"COPY {table_name}")
+
+        if hasattr(records, "__aiter__"):
+            rows = [record async for record in records]
+        else:
+            rows = list(records)
+
+        self.copied[table_name] = rows
+        return f"COPY {len(rows)}"
+
+    def check_idle(self) -> None:
+        if self.busy:
+            raise asyncpg.InterfaceError("cannot perform operation: another operation is in progress")
+
+    def _lock(self, key: int, xact: bool) -> None:
+        if key in self.held_by_others:
+            # Without lock_timeout the server would wait forever
+            assert self.settings["lock_timeout"] != "0", "Lock would never be acquired"
+            raise asyncpg.LockNotAvailableError("canceling statement due to lock timeout")
+
+        (self.xact_locks if xact else self.locks).append(key)
+
+    def _run(self, query: str) -> None:
+        self.check_idle()
+        self.log.append(query)
+
+        if self.error is not None:
+            raise self.error
+
+
+class TestPool:
+    """Fake MeteredPool handing out one TestConnection"""
+
+    __test__ = False
+
+    def __init__(self, name: str = "primary", size: int = 0, idle: int = 0):
+        self.connection = TestConnection(name)
+        self.size = size
+        self.idle = idle
+        self.waiting = 0
+        self.acquired = 0
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        try:
+            yield self.connection
+        finally:
+            self.acquired -= 1
+
+    async def execute(self, query: str, *args, timeout: float | None = None):
+        return await self.connection.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, query: str, args, *, timeout: float | None = None):
+        return await self.connection.executemany(query, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: float | None = None):
+        return await self.connection.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: float | None = None):
+        return await self.connection.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, timeout: float | None = None):
+        return await self.connection.fetchval(query, *args, timeout=timeout)
+
+    def get_size(self) -> int:
+        return self.size
+
+    def get_idle_size(self) -> int:
+        return self.idle
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            size=self.size,
+            idle=self.idle,
+            max_size=self.size,
+            waiting=self.waiting,
+            acquired=0,
+            acquire_time=0.0,
+            max_acquire_time=0.0,
+        )
+
+    async def close(self) -> None:
+        self.closed = True
+        await self.connection.close()
@@ -1,11 +1,15 @@
 import asyncio
-import contextlib
 from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Mapping
 
 import asyncpg.transaction
 from data.storage.postgres.asyncpg_impl import AsyncpgPostgresDatabase, TransactionContext
-from data.storage.postgres.transaction import current_transaction
+from data.storage.postgres.transaction import (
+    current_settings,
+    current_transaction,
+    set_local_settings,
+    timeout_settings,
+)
 
 
 class PoolProxy:
@@ -17,11 +21,16 @@ class PoolProxy:
     def __getattr__(self, item):
         if item in {"fetch", "fetchrow", "fetchval", "execute", "executemany"}:
             return self.operation_proxy(item)
-        elif item == "acquire":  # call when cursor is using
-            return lambda: contextlib.nullcontext(self.tx_conn)
 
         return getattr(self._pool, item)
 
+    @asynccontextmanager
+    async def acquire(self):
+        # Used by cursors and prepared statements, which run on the connection of the test transaction
+        if self.tx_conn is None:
+            await self.start_transaction()
+        yield self.tx_conn
+
     async def start_transaction(self):
         assert self.tx_ctx is None, "Transaction already started"
 
@@ -49,11 +58,26 @@ class AsyncpgTestPostgresDatabase(AsyncpgPostgresDatabase):
         return self.pool_proxy
 
     @asynccontextmanager
-    async def transaction(self, isolation: str = "read_committed"):
+    async def transaction(
+        self,
+        isolation: str = "read_committed",
+        read_only: bool = False,
+        deferrable: bool = False,
+        *,
+        use_replica: bool = False,
+        **timeouts,
+    ):
         if self.pool.tx_ctx is None:
             await self.pool.start_transaction()
         current_transaction.set(self.pool.tx_conn)
-        yield self.pool.tx_conn
+
+        # Test runs in one transaction, so every transaction of the code under test is a savepoint
+        settings = timeout_settings(**timeouts)
+        async with self.pool.tx_conn.transaction():
+            previous = await current_settings(self.pool.tx_conn, list(settings))
+            await set_local_settings(self.pool.tx_conn, settings)
+            yield self.pool.tx_conn
+            await set_local_settings(self.pool.tx_conn, previous)
 
     async def rollback_transaction(self):
         if self.pool.tx_ctx is None:
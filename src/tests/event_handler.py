@@ -12,8 +12,16 @@ class TestEventHandler(EventHandler):
 
     _ex_class: Type[Exception] | None = None
 
-    def __init__(self, *, batch_id: str | None = None, fail: bool = False, delay: bool = False):
+    def __init__(
+        self,
+        *,
+        batch_id: str | None = None,
+        fail: bool = False,
+        delay: bool = False,
+        max_size: int = 1000,
+    ):
         self._batch_id = batch_id
+        self._max_size = max_size
 
         if fail:
             self._ex_class = UnexpectedError
@@ -21,6 +29,7 @@ class TestEventHandler(EventHandler):
             self._ex_class = RetryLater
 
         self.received_events: list[Event] = []
+        self.received_batch_sizes: list[int] = []
         self.rolled_back_events: list[Event] = []
 
     def reset(self):
@@ -41,6 +50,7 @@ class TestEventHandler(EventHandler):
 
     async def handle_batch(self, events: list[Event]):
         self.received_events.extend(events)
+        self.received_batch_sizes.append(len(events))
 
         if self._ex_class:
             raise self._ex_class
@@ -48,7 +58,7 @@ class TestEventHandler(EventHandler):
     def batching_settings(self) -> BatchingSettings:
         return BatchingSettings(
             window=timedelta(seconds=0.1),
-            max_size=1000,
+            max_size=self._max_size,
         )
 
     def batch_id(self, event: Event) -> str | None:
@@ -0,0 +1,63 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncGenerator, AsyncIterator
+
+from domain.events.datasources.events import EventsDatasource
+from domain.events.models.event_record import EventRecord
+
+
+class TestEventsDatasource(EventsDatasource):
+    __test__ = False
+
+    def __init__(self) -> None:
+        self.records: dict[str, EventRecord] = {}
+        self.queries: list[str] = []
+
+    async def save(self, event: EventRecord) -> EventRecord | None:
+        self.queries.append("save")
+        if event.id in self.records:
+            return None
+
+        self.records[event.id] = event
+        return event
+
+    async def save_many(self, events: list[EventRecord]) -> set[str]:
+        self.queries.append("save_many")
+        saved_ids = set()
+        for event in events:
+            if event.id not in self.records:
+                self.records[event.id] = event
+                saved_ids.add(event.id)
+
+        return saved_ids
+
+    async def get_by_id(self, id: str) -> EventRecord | None:
+        return self.records.get(id)
+
+    @asynccontextmanager
+    async def tap(self, event_id: str) -> AsyncGenerator[EventRecord | None, None]:
+        self.queries.append("tap")
+        yield self.records.get(event_id)
+
+    async def get_multiple(
+        self,
+        processed: bool | None = None,
+        event_types: list[str] | None = None,
+    ) -> AsyncIterator[EventRecord]:
+        for record in self.records.values():
+            if processed is None or (record.processed_at is not None) == processed:
+                if event_types is None or record.event in event_types:
+                    yield record
+
+    async def set_unprocessed(self, event_id: str) -> None:
+        self.records[event_id].processed_at = None
+
+    async def mark_processed_many(self, event_ids: list[str], processed_at: datetime) -> None:
+        self.queries.append("mark_processed_many")
+        for event_id in event_ids:
+            self.records[event_id].processed_at = processed_at
+
+    async def delete_many(self, event_ids: list[str]) -> None:
+        self.queries.append("delete_many")
+        for event_id in event_ids:
+            self.records.pop(event_id, None)
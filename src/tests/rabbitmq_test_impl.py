@@ -10,7 +10,7 @@ class TestRabbitMQEventBroker(EventBroker):
     def __init__(self) -> None:
         self._published: list[dict] = []
 
-    async def listen(self, queue_name: str):
+    async def listen(self, queue_name: str, prefetch_count: int | None = None):
         pass
 
     async def publish(self, queue_name: str, message: dict, delay: timedelta = timedelta()) -> None:
@@ -22,6 +22,10 @@ class TestRabbitMQEventBroker(EventBroker):
             }
         )
 
+    async def publish_many(self, queue_name: str, messages: list[dict], delay: timedelta = timedelta()) -> None:
+        for message in messages:
+            await self.publish(queue_name, message, delay)
+
     def published_messages(self):
         result = [*self._published]
         self._published.clear()